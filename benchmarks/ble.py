@@ -0,0 +1,160 @@
+# Polls a Bluetooth inverter backed by a local stand-in for the BLE peripheral and reports poll latency and the time
+# the radio link was kept busy per poll, for one connection per read (the former behavior), concurrent reads over a
+# single connection and notifications (with and without notification support on the peripheral side).
+#
+#     python -m benchmarks.ble [--polls N] [--connect-time 0.5] [--round-trip-time 0.05] [--notify-interval 1]
+
+import argparse
+import asyncio
+import logging
+import statistics
+import struct
+import time
+
+from collections.abc import Callable
+from typing import Any
+
+import bleak.exc
+
+from qtoggleserver.mppsolar import BluetoothMPPSolarInverter
+
+
+RESPONSES = {
+    BluetoothMPPSolarInverter.STATUS1_HANDLE: struct.pack(
+        "<HHHHHHHHHH", 2300, 500, 2300, 500, 575, 510, 11, 375, 5290, 0
+    ),
+    BluetoothMPPSolarInverter.STATUS2_HANDLE: struct.pack("<HHHHHHHHHH", 88, 34, 0, 0, 0, 0, ord("B"), 0, 0, 0),
+    BluetoothMPPSolarInverter.PV1_STATUS_HANDLE: struct.pack("<HHHHHHHHHH", 0, 0, 0, 0, 0, 41, 2456, 1006, 0, 0),
+}
+
+
+class StandInClient:
+    # Behaves like a `BleakClient` connected to an inverter: connecting takes `connect_time` and each attribute read
+    # takes `round_trip_time`, with reads being served one at a time, like ATT requests on a real link
+
+    def __init__(
+        self, *, connect_time: float, round_trip_time: float, notify_interval: float | None, stats: dict[str, float]
+    ) -> None:
+        self._connect_time: float = connect_time
+        self._round_trip_time: float = round_trip_time
+        self._notify_interval: float | None = notify_interval
+        self._stats: dict[str, float] = stats
+        self._connected: bool = False
+        self._att_lock: asyncio.Lock = asyncio.Lock()
+        self._notify_tasks: list[asyncio.Task] = []
+
+    async def __aenter__(self) -> "StandInClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.disconnect()
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self) -> None:
+        await self._use_radio(self._connect_time)
+        self._connected = True
+
+    async def disconnect(self) -> None:
+        for task in self._notify_tasks:
+            task.cancel()
+        self._notify_tasks = []
+        self._connected = False
+
+    async def read_gatt_char(self, handle: int) -> bytearray:
+        async with self._att_lock:
+            await self._use_radio(self._round_trip_time)
+
+        return bytearray(RESPONSES[handle])
+
+    async def start_notify(self, handle: int, callback: Callable[[Any, bytearray], None]) -> None:
+        if self._notify_interval is None:
+            raise bleak.exc.BleakError(f"Characteristic {handle} does not support notifications")
+
+        self._notify_tasks.append(asyncio.create_task(self._notify_loop(handle, callback)))
+
+    async def _notify_loop(self, handle: int, callback: Callable[[Any, bytearray], None]) -> None:
+        while True:
+            await asyncio.sleep(self._notify_interval)
+            await self._use_radio(self._round_trip_time / 2)  # a notification is a one-way transfer
+            callback(handle, bytearray(RESPONSES[handle]))
+
+    async def _use_radio(self, duration: float) -> None:
+        await asyncio.sleep(duration)
+        self._stats["radio_time"] += duration
+
+
+class StandInInverter(BluetoothMPPSolarInverter):
+    def __init__(self, *, client_args: dict[str, Any], **kwargs) -> None:
+        self._client_args: dict[str, Any] = client_args
+        self.stats: dict[str, float] = {"radio_time": 0}
+
+        super().__init__(**kwargs)
+
+    def make_client(self, timeout: int) -> StandInClient:
+        return StandInClient(stats=self.stats, **self._client_args)
+
+    async def read_properties_per_connection(self) -> None:
+        # The former way of reading: one connection for each characteristic, one after the other
+        for handle in self.LAYOUTS:
+            self.parse_data(handle, (await self._run_cmd(self._read_handles, handles=[handle]))[0])
+
+
+async def run(name: str, args: argparse.Namespace, use_notifications: bool, per_connection: bool = False) -> None:
+    inverter = StandInInverter(
+        address="00:00:00:00:00:00",
+        model="GK",
+        use_notifications=use_notifications,
+        client_args={
+            "connect_time": args.connect_time,
+            "round_trip_time": args.round_trip_time,
+            "notify_interval": args.notify_interval if name != "notifications unavailable" else None,
+        },
+        params={},
+        name="bench_ble",
+    )
+
+    latencies, radio_times = [], []
+    for _ in range(args.polls):
+        start_time, start_radio_time = time.perf_counter(), inverter.stats["radio_time"]
+        if per_connection:
+            await inverter.read_properties_per_connection()
+        else:
+            await inverter.read_properties()
+        latencies.append(time.perf_counter() - start_time)
+
+        # Let notifications (if any) flow in between polls, like they would during the poll interval
+        await asyncio.sleep(args.notify_interval)
+        radio_times.append(inverter.stats["radio_time"] - start_radio_time)
+
+    await inverter.disconnect()
+    assert inverter.get_property("pv_power") == 1006
+
+    print(
+        f"{name:>26}: poll latency median {statistics.median(latencies) * 1000:7.1f} ms, "
+        f"max {max(latencies) * 1000:7.1f} ms; radio time per poll median "
+        f"{statistics.median(radio_times) * 1000:7.1f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--polls", type=int, default=10)
+    parser.add_argument("--connect-time", type=float, default=0.5)
+    parser.add_argument("--round-trip-time", type=float, default=0.05)
+    parser.add_argument("--notify-interval", type=float, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+
+    await run("connection per read", args, use_notifications=False, per_connection=True)
+    await run("single connection", args, use_notifications=False)
+    await run("notifications", args, use_notifications=True)
+    await run("notifications unavailable", args, use_notifications=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,184 @@
+# Benchmarks the command layer for every command class of every model, reporting operations per second and bytes
+# allocated per call, and compares results against stored baselines.
+#
+#     python -m benchmarks.commands [--threshold 0.5] [--save-baseline] [--baseline PATH] [--filter TEXT]
+#
+# Rates are stored and compared relative to a fixed reference workload measured in the same run, so that baselines
+# carry over between machines of different speeds. Exits with status 1 if any case is slower than its baseline by more
+# than the given threshold (a fraction of the baseline relative rate).
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import timeit
+import tracemalloc
+
+from collections.abc import Callable
+
+from qtoggleserver.mppsolar import SerialMPPSolarInverter
+from qtoggleserver.mppsolar.commands import COMMANDS_BY_MODEL, Command
+from qtoggleserver.mppsolar.io import BaseIO
+from qtoggleserver.mppsolar.replay import ReplayIO
+
+from .parse_response import make_frame, make_sample_payload
+
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "commands.json")
+REFERENCE_DATA = bytes(range(256)) * 4
+REFERENCE_MEASUREMENTS = 3
+
+
+def run_reference() -> int:
+    # A pure-Python byte loop, similar in nature to the cases but independent of the code being benchmarked
+    total = 0
+    for b in REFERENCE_DATA:
+        total = ((total << 5) ^ b) & 0xFFFF
+
+    return total
+
+
+class ReplayInverter(SerialMPPSolarInverter):
+    CMD_WAIT = 0
+
+    def make_io(self) -> BaseIO:
+        return ReplayIO(self._model, processing_time=0)
+
+
+def make_request_params(cls: type[Command]) -> dict:
+    params = dict(cls.REQUEST_DEFAULT_VALUES)
+    for name, details in cls.get_request_property_definitions().items():
+        params[name] = 1 if details["format"].endswith("d") else 50.0
+
+    return params
+
+
+def reset_caches(cls: type[Command]) -> None:
+    cls._response_regex = None
+    cls._response_property_definitions = None
+
+
+def make_cases() -> dict[str, Callable[[], object]]:
+    cases = {}
+    classes = sorted({cls for classes in COMMANDS_BY_MODEL.values() for cls in classes}, key=lambda c: c.__name__)
+    for cls in classes:
+        name = cls.__name__
+        params = make_request_params(cls)
+        message = cls.REQUEST_FMT.format(**params).encode()
+        cmd = cls(**params)
+        if cls.RESPONSE_FMT:
+            response = make_frame(make_sample_payload(cls))
+        else:
+            response = make_frame(b"ACK")
+
+        cases[f"{name}.compute_crc"] = lambda cls=cls, message=message: cls.compute_crc(message)
+        cases[f"{name}.prepare_request"] = lambda cls=cls, params=params: cls(**params).prepare_request()
+        cases[f"{name}.parse_response"] = lambda cmd=cmd, response=response: cmd.parse_response(response)
+        cases[f"{name}.get_response_regex"] = lambda cls=cls: (reset_caches(cls), cls.get_response_regex())
+        cases[f"{name}.get_response_property_definitions"] = lambda cls=cls: (
+            reset_caches(cls),
+            cls.get_response_property_definitions(),
+        )
+
+    loop = asyncio.new_event_loop()
+    for model in sorted(COMMANDS_BY_MODEL):
+        inverter = ReplayInverter(
+            serial_port=f"replay:{model}", model=model, cache_capabilities=False, params={}, name=f"bench_{model}"
+        )
+        cases[f"{model}.probe_capabilities"] = lambda inverter=inverter: loop.run_until_complete(
+            inverter.probe_capabilities()
+        )
+        cases[f"{model}.make_port_args"] = lambda inverter=inverter: loop.run_until_complete(inverter.make_port_args())
+
+        # A full round trip through the IO layer, with and without tracing
+        status_cls = next(cls for cls in COMMANDS_BY_MODEL[model] if cls.get_name() == "QPIGS")
+        cases[f"{model}.run_command"] = lambda inverter=inverter, cls=status_cls: loop.run_until_complete(
+            inverter.run_command(cls)
+        )
+        traced_inverter = ReplayInverter(
+            serial_port=f"replay:{model}",
+            model=model,
+            trace_buffer_size=1000,
+            cache_capabilities=False,
+            params={},
+            name=f"bench_{model}_traced",
+        )
+        cases[f"{model}.run_command_traced"] = lambda inverter=traced_inverter, cls=status_cls: loop.run_until_complete(
+            inverter.run_command(cls)
+        )
+
+    return cases
+
+
+def measure(func: Callable[[], object]) -> tuple[float, float]:
+    func()  # warm up
+    number, total_time = timeit.Timer(func).autorange()
+    ops_per_sec = number / total_time
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start_size, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return ops_per_sec, peak_size - start_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed slowdown, as a fraction of baseline")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--filter", help="only run cases matching this regular expression")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # The best of a few measurements, as the reference is what all cases are scaled by
+    reference_ops_per_sec = max(measure(run_reference)[0] for _ in range(REFERENCE_MEASUREMENTS))
+    print(f"reference: {reference_ops_per_sec:.1f} ops/sec")
+
+    results = {}
+    regressions = []
+    print(f"{'case':<48} {'ops/sec':>12} {'alloc B/call':>13} {'relative':>10} {'vs baseline':>12}")
+    for name, func in make_cases().items():
+        if args.filter and not re.search(args.filter, name):
+            continue
+
+        ops_per_sec, allocated = measure(func)
+        relative_rate = ops_per_sec / reference_ops_per_sec
+        results[name] = float(f"{relative_rate:.4g}")
+
+        comparison = ""
+        if name in baseline:
+            ratio = relative_rate / baseline[name]
+            comparison = f"{ratio:11.2f}x"
+            if ratio < 1 - args.threshold:
+                regressions.append(name)
+                comparison += " REGRESSION"
+
+        print(f"{name:<48} {ops_per_sec:12.1f} {allocated:13d} {relative_rate:10.4g} {comparison}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(dict(baseline, **results), f, indent=4, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Compares the table-driven CRC and cached request frames against the previous nibble-based implementation.
+#
+#     python -m benchmarks.crc [--iterations N]
+
+import argparse
+import ctypes
+import random
+import timeit
+
+from qtoggleserver.mppsolar.commands import QPIGS_MAX, QPIRI_MAX, Command
+
+
+NIBBLE_CRC_TABLE = [
+    0x0000,
+    0x1021,
+    0x2042,
+    0x3063,
+    0x4084,
+    0x50A5,
+    0x60C6,
+    0x70E7,
+    0x8108,
+    0x9129,
+    0xA14A,
+    0xB16B,
+    0xC18C,
+    0xD1AD,
+    0xE1CE,
+    0xF1EF,
+]
+
+RESPONSE = "(230.0 50.0 230.0 50.0 0575 0510 011 375 52.90 012 088 0034 04.1 245.6 00.00 00000 00010110 00 00 01007 010"
+
+
+def nibble_crc(message: str) -> bytes:
+    crc = 0
+    for c in message:
+        c = ord(c)
+
+        t_da = ctypes.c_uint8(crc >> 8)
+        da = t_da.value >> 4
+        crc <<= 4
+        index = da ^ (c >> 4)
+        crc ^= NIBBLE_CRC_TABLE[index]
+        t_da = ctypes.c_uint8(crc >> 8)
+        da = t_da.value >> 4
+        crc <<= 4
+        index = da ^ (c & 0x0F)
+        crc ^= NIBBLE_CRC_TABLE[index]
+
+    crc_low = ctypes.c_uint8(crc).value
+    crc_high = ctypes.c_uint8(crc >> 8).value
+
+    if crc_low in (0x28, 0x0D, 0x0A):
+        crc_low += 1
+
+    if crc_high in (0x28, 0x0D, 0x0A):
+        crc_high += 1
+
+    return bytes((crc_high, crc_low))
+
+
+def nibble_prepare_request(cls: type[Command]) -> bytes:
+    message = cls.REQUEST_FMT
+    return message.encode() + nibble_crc(message) + b"\r"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    for _ in range(10000):
+        message = "".join(chr(rnd.randrange(32, 127)) for _ in range(rnd.randrange(1, 120)))
+        assert Command.compute_crc(message) == nibble_crc(message), message
+        assert Command.compute_crc(message.encode()) == nibble_crc(message), message
+
+    for cls in (QPIGS_MAX, QPIRI_MAX):
+        assert cls().prepare_request() == nibble_prepare_request(cls)
+
+    response = RESPONSE.encode()
+    cases = [
+        ("response CRC", lambda: nibble_crc(RESPONSE), lambda: Command.compute_crc(response)),
+        ("QPIGS request", lambda: nibble_prepare_request(QPIGS_MAX), lambda: QPIGS_MAX().prepare_request()),
+        ("QPIRI request", lambda: nibble_prepare_request(QPIRI_MAX), lambda: QPIRI_MAX().prepare_request()),
+    ]
+
+    print(f"{'case':>14} {'nibble (us)':>12} {'table (us)':>11} {'speedup':>8}")
+    for name, old, new in cases:
+        old_time = timeit.timeit(old, number=args.iterations)
+        new_time = timeit.timeit(new, number=args.iterations)
+        print(
+            f"{name:>14} {old_time / args.iterations * 1e6:12.2f} {new_time / args.iterations * 1e6:11.2f} "
+            f"{old_time / new_time:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
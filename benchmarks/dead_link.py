@@ -0,0 +1,101 @@
+# Checks dead link detection against replayed inverters: a command that the inverter ignores must not take the link
+# down, however many times it's retried, while an inverter that answers nothing at all must be detected before it's
+# polled as many times as the dead link threshold. Reports how long detection takes.
+#
+#     python -m benchmarks.dead_link [--model MAX] [--cycles N] [--command-retries N] [--dead-link-threshold N]
+
+import argparse
+import asyncio
+import logging
+import time
+
+from qtoggleserver.mppsolar import SerialMPPSolarInverter
+from qtoggleserver.mppsolar.exceptions import MPPSolarIOUnavailable
+from qtoggleserver.mppsolar.io import BaseIO
+from qtoggleserver.mppsolar.replay import RECORDINGS, ReplayIO
+
+
+IGNORED_REQUEST = b"QPIGS"
+
+
+class ReplayInverter(SerialMPPSolarInverter):
+    def __init__(self, *, replay_args: dict, **kwargs) -> None:
+        self._replay_args: dict = replay_args
+        self.io_open_count: int = 0
+        self.CMD_WAIT = 0.01
+
+        super().__init__(**kwargs)
+
+    def make_io(self) -> BaseIO:
+        self.io_open_count += 1
+        return ReplayIO(self._model, baud=self._serial_baud, **self._replay_args)
+
+
+def make_inverter(model: str, args: argparse.Namespace, replay_args: dict) -> ReplayInverter:
+    return ReplayInverter(
+        serial_port=f"replay:{model}",
+        serial_baud=115200,
+        model=model,
+        cache_capabilities=False,
+        command_poll_intervals={"QPIRI": 0},
+        command_retries=args.command_retries,
+        command_retry_backoff=0.01,
+        breaker_failure_threshold=0,
+        first_byte_timeout=args.first_byte_timeout,
+        dead_link_threshold=args.dead_link_threshold,
+        replay_args=dict(replay_args, seed=0),
+        params={},
+        name=f"bench_{model.lower()}",
+    )
+
+
+async def check_ignored_command(model: str, args: argparse.Namespace) -> None:
+    inverter = make_inverter(model, args, {"ignored_requests": [IGNORED_REQUEST]})
+    await inverter.make_port_args()
+    for _ in range(args.cycles):
+        await inverter.read_properties()
+    inverter.close_io()
+
+    stats = inverter.get_stats()["commands"]
+    assert stats[IGNORED_REQUEST.decode()]["timeouts"] == args.cycles * (args.command_retries + 1)
+    assert inverter.io_open_count == 1, f"{model}: link taken down by a single ignored command"
+
+
+async def check_dead_inverter(model: str, args: argparse.Namespace) -> tuple[int, float]:
+    inverter = make_inverter(model, args, {"timeout_rate": 1})
+
+    start_time = time.perf_counter()
+    try:
+        for cycle in range(1, args.dead_link_threshold + 1):
+            try:
+                await inverter.read_properties()
+            except MPPSolarIOUnavailable:
+                return cycle, time.perf_counter() - start_time
+    finally:
+        inverter.close_io()
+
+    raise AssertionError(f"{model}: dead link not detected within {args.dead_link_threshold} poll cycles")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=sorted(RECORDINGS), action="append")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--command-retries", type=int, default=2)
+    parser.add_argument("--dead-link-threshold", type=int, default=3)
+    parser.add_argument("--first-byte-timeout", type=float, default=0.1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+
+    for model in args.model or sorted(RECORDINGS):
+        await check_ignored_command(model, args)
+        cycles, detection_time = await check_dead_inverter(model, args)
+        print(
+            f"{model:>4}: ignored {IGNORED_REQUEST.decode()} kept the link up; dead link detected in "
+            f"{detection_time * 1000:.1f} ms ({cycles} poll cycles)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+# Polls fleets of N replayed inverters with various concurrency limits and reports poll cycle wall time and CPU time,
+# showing how the fleet driver scales with the number of inverters.
+#
+#     python -m benchmarks.fleet [--model MAX] [--inverters 1,2,4,8,16] [--max-concurrency 1,4,16] [--cycles N]
+#                                [--baud 2400] [--stagger-interval S]
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from qtoggleserver.mppsolar import MPPSolarFleet
+from qtoggleserver.mppsolar.replay import RECORDINGS
+
+
+async def run(model: str, inverter_count: int, max_concurrency: int, args: argparse.Namespace) -> None:
+    fleet = MPPSolarFleet(
+        inverters=[
+            {
+                "serial_port": f"replay:{model}",
+                "serial_baud": args.baud,
+                "adaptive_cmd_wait": True,
+                "cache_capabilities": False,
+            }
+            for _ in range(inverter_count)
+        ],
+        model=model,
+        max_concurrency=max_concurrency,
+        stagger_interval=args.stagger_interval,
+        params={},
+        name="bench_fleet",
+    )
+    await fleet.make_port_args()
+
+    wall_times, cpu_times = [], []
+    for _ in range(args.cycles):
+        start_time, start_cpu_time = time.perf_counter(), time.process_time()
+        await fleet.read_properties()
+        wall_times.append(time.perf_counter() - start_time)
+        cpu_times.append(time.process_time() - start_cpu_time)
+
+    await fleet.handle_cleanup()
+
+    print(
+        f"{model:>4} x {inverter_count:<3} concurrency {max_concurrency:<3}: read_properties median "
+        f"{statistics.median(wall_times) * 1000:8.1f} ms wall {statistics.median(cpu_times) * 1000:7.2f} ms CPU, "
+        f"total PV power {fleet.get_property('total_pv_power')}"
+    )
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=sorted(RECORDINGS), default="MAX")
+    parser.add_argument("--inverters", type=int_list, default=[1, 2, 4, 8, 16])
+    parser.add_argument("--max-concurrency", type=int_list, default=[1, 4, 16])
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--baud", type=int, default=2400)
+    parser.add_argument("--stagger-interval", type=float, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+
+    for inverter_count in args.inverters:
+        for max_concurrency in args.max_concurrency:
+            if max_concurrency > inverter_count and max_concurrency != min(args.max_concurrency):
+                continue  # same as unbounded
+            await run(args.model, inverter_count, max_concurrency, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+# Compares per-command round-trip time of the polled read loop against the event-driven reader, using a pseudo-terminal
+# pair as a stand-in for the inverter link.
+#
+#     python -m benchmarks.io_read [--commands N] [--delay SECONDS]
+
+import argparse
+import asyncio
+import os
+import pty
+import statistics
+import time
+import tty
+
+from qtoggleserver.mppsolar.commands import QPIGS_GKMK
+from qtoggleserver.mppsolar.io import HIDRawIO
+
+
+RESPONSE = (
+    b"(230.0 50.0 230.0 50.0 0575 0510 011 375 52.90 012 088 0034 04.1 245.6 00.00 00000 00010110 00 00 01007 010"
+)
+
+
+class Responder:
+    def __init__(self, master_fd: int, delay: float) -> None:
+        self._master_fd: int = master_fd
+        self._delay: float = delay
+        self._request: bytes = b""
+
+        asyncio.get_running_loop().add_reader(master_fd, self._on_readable)
+
+    def _on_readable(self) -> None:
+        self._request += os.read(self._master_fd, 1024)
+        if self._request.endswith(b"\r"):
+            self._request = b""
+            frame = RESPONSE + QPIGS_GKMK.compute_crc(RESPONSE.decode()) + b"\r"
+            asyncio.get_running_loop().call_later(self._delay, os.write, self._master_fd, frame)
+
+    def close(self) -> None:
+        asyncio.get_running_loop().remove_reader(self._master_fd)
+
+
+async def measure(read_mode: str, count: int, delay: float) -> list[float]:
+    master_fd, slave_fd = pty.openpty()
+    tty.setraw(master_fd)
+    tty.setraw(slave_fd)
+    responder = Responder(master_fd, delay)
+    io = HIDRawIO(os.ttyname(slave_fd))
+    request = QPIGS_GKMK().prepare_request()
+
+    durations = []
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            io.write(request)
+            if read_mode == "polled":
+                response = await io.read_polled(10)
+            else:
+                response = await io.read(10)
+            durations.append(time.perf_counter() - start)
+            assert response.endswith(b"\r"), response
+    finally:
+        responder.close()
+        io.close()
+        os.close(slave_fd)
+        os.close(master_fd)
+
+    return durations
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.03, help="emulated inverter response delay, in seconds")
+    args = parser.parse_args()
+
+    for read_mode in ("polled", "event-driven"):
+        durations = await measure(read_mode, args.commands, args.delay)
+        print(
+            f"{read_mode:>12}: mean {statistics.mean(durations) * 1000:7.2f} ms, "
+            f"median {statistics.median(durations) * 1000:7.2f} ms, "
+            f"max {max(durations) * 1000:7.2f} ms over {len(durations)} commands"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+# Checks that compiled response decoders produce the same output as the regex-based parser, for every response command
+# of every model, that both reject the same malformed payloads, and compares their speed.
+#
+#     python -m benchmarks.parse_response [--iterations N]
+
+import argparse
+import re
+import timeit
+
+from collections.abc import Callable
+
+from qtoggleserver.mppsolar.commands import COMMANDS_BY_MODEL, Command
+from qtoggleserver.mppsolar.commands.base import ResponseDecoder, ResponseError
+from qtoggleserver.mppsolar.typing import Properties
+
+
+def make_sample_payload(cls: type[Command]) -> bytes:
+    response_fmt = cls.RESPONSE_FMT
+    if response_fmt.endswith("..."):
+        return b"010 020 030 040 050 060"
+
+    sample_values = {"d": "12", "f": "230.5", "s": "B"}
+    tokens = []
+    for i, token_fmt in enumerate(response_fmt.split()):
+        fields = re.findall(r"{[^:]+:([dfbs])}", token_fmt)
+        if fields == ["b"] * len(fields) and len(fields) > 1:
+            tokens.append("".join(str((i + j) % 2) for j in range(len(fields))))
+        else:
+            tokens.append(sample_values[fields[0]] if fields[0] != "b" else str(i % 2))
+
+    return " ".join(tokens).encode()
+
+
+# Tokens that Python's number parsing would accept, but the response format doesn't
+MALFORMED_TOKENS = (b"nan", b"inf", b"-inf", b"1e3", b"+920", b"1_0", b"1.2.3", b"12abc", b"--1", b"-", b".", b"\xff")
+
+
+def make_malformed_payloads(payload: bytes) -> list[bytes]:
+    tokens = payload.split()
+    payloads = [b" " + payload, payload + b" ", payload + b"x", b""]
+    for i in range(len(tokens)):
+        for malformed_token in MALFORMED_TOKENS:
+            payloads.append(b" ".join(tokens[:i] + [malformed_token] + tokens[i + 1 :]))
+
+    return payloads
+
+
+def parse_or_error(func: Callable[[bytes], Properties], payload: bytes) -> Properties | type[ResponseError]:
+    try:
+        return func(payload)
+    except ResponseError:
+        return ResponseError
+
+
+def parse_regex(cls: type[Command], payload: bytes) -> Properties:
+    # Like Command.parse_response() does for commands without a decoder
+    try:
+        payload_str = payload.decode()
+    except UnicodeDecodeError:
+        raise ResponseError() from None
+
+    return cls.parse_payload_regex(payload_str)
+
+
+def check_malformed_parity(cls: type[Command], payload: bytes, decoder: ResponseDecoder) -> None:
+    for malformed_payload in make_malformed_payloads(payload):
+        expected = parse_or_error(lambda p: parse_regex(cls, p), malformed_payload)
+        actual = parse_or_error(decoder.decode, malformed_payload)
+        assert actual == expected, f"{cls.__name__} {malformed_payload!r}: {actual} != {expected}"
+
+
+def make_frame(payload: bytes) -> bytes:
+    message = "(" + payload.decode()
+    return message.encode() + Command.compute_crc(message) + b"\r"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    classes = sorted(
+        {cls for classes in COMMANDS_BY_MODEL.values() for cls in classes if cls.RESPONSE_FMT},
+        key=lambda c: c.__name__,
+    )
+
+    print(f"{'command':>12} {'regex (us)':>12} {'compiled (us)':>14} {'speedup':>8}")
+    for cls in classes:
+        payload = make_sample_payload(cls)
+        decoder = cls.get_response_decoder()
+        assert decoder is not None, f"{cls.__name__} has no compiled decoder"
+
+        expected = cls.parse_payload_regex(payload.decode())
+        actual = decoder.decode(payload)
+        assert actual == expected, f"{cls.__name__}: {actual} != {expected}"
+        assert cls().parse_response(make_frame(payload)) is not None
+        check_malformed_parity(cls, payload, decoder)
+
+        regex_time = timeit.timeit(lambda: cls.parse_payload_regex(payload.decode()), number=args.iterations)
+        compiled_time = timeit.timeit(lambda: decoder.decode(payload), number=args.iterations)
+        print(
+            f"{cls.__name__:>12} {regex_time / args.iterations * 1e6:12.2f} "
+            f"{compiled_time / args.iterations * 1e6:14.2f} {regex_time / compiled_time:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
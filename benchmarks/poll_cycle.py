@@ -0,0 +1,95 @@
+# Runs make_port_args() and read_properties() end to end against replayed inverters and reports poll cycle wall time
+# and CPU time.
+#
+#     python -m benchmarks.poll_cycle [--model MAX] [--cycles N] [--baud 2400] [--cmd-wait 0.5] [--adaptive-cmd-wait]
+#                                     [--crc-error-rate R] [--nak-rate R] [--timeout-rate R] [--parallel-units N]
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from qtoggleserver.mppsolar import SerialMPPSolarInverter
+from qtoggleserver.mppsolar.io import BaseIO
+from qtoggleserver.mppsolar.replay import RECORDINGS, ReplayIO
+
+
+class ReplayInverter(SerialMPPSolarInverter):
+    def __init__(self, *, replay_args: dict, cmd_wait: float, **kwargs) -> None:
+        self._replay_args: dict = replay_args
+        self.CMD_WAIT = cmd_wait
+
+        super().__init__(**kwargs)
+
+    def make_io(self) -> BaseIO:
+        return ReplayIO(self._model, baud=self._serial_baud, **self._replay_args)
+
+
+async def run(model: str, args: argparse.Namespace) -> None:
+    inverter = ReplayInverter(
+        serial_port=f"replay:{model}",
+        serial_baud=args.baud,
+        model=model,
+        adaptive_cmd_wait=args.adaptive_cmd_wait,
+        command_poll_intervals={"QPIRI": 0} if args.all_commands else None,
+        parallel_units=args.parallel_units,
+        cache_capabilities=False,
+        cycle_budget=args.cycle_budget,
+        replay_args={
+            "crc_error_rate": args.crc_error_rate,
+            "nak_rate": args.nak_rate,
+            "timeout_rate": args.timeout_rate,
+            "seed": 0,
+        },
+        cmd_wait=args.cmd_wait,
+        params={},
+        name=f"bench_{model.lower()}",
+    )
+    inverter.TIMEOUT = args.timeout
+
+    start_time, start_cpu_time = time.perf_counter(), time.process_time()
+    port_args = await inverter.make_port_args()
+    port_args_time = time.perf_counter() - start_time
+    port_args_cpu_time = time.process_time() - start_cpu_time
+
+    wall_times, cpu_times = [], []
+    for _ in range(args.cycles):
+        start_time, start_cpu_time = time.perf_counter(), time.process_time()
+        await inverter.read_properties()
+        wall_times.append(time.perf_counter() - start_time)
+        cpu_times.append(time.process_time() - start_cpu_time)
+
+    inverter.close_io()
+
+    print(
+        f"{model:>4}: make_port_args {port_args_time * 1000:8.1f} ms wall {port_args_cpu_time * 1000:6.2f} ms CPU "
+        f"({len(port_args)} ports); read_properties median {statistics.median(wall_times) * 1000:8.1f} ms wall "
+        f"{statistics.median(cpu_times) * 1000:6.2f} ms CPU, max {max(wall_times) * 1000:8.1f} ms wall"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=sorted(RECORDINGS), action="append")
+    parser.add_argument("--cycles", type=int, default=10)
+    parser.add_argument("--baud", type=int, default=2400)
+    parser.add_argument("--cmd-wait", type=float, default=SerialMPPSolarInverter.CMD_WAIT)
+    parser.add_argument("--adaptive-cmd-wait", action="store_true")
+    parser.add_argument("--all-commands", action="store_true", help="poll settings commands on every cycle")
+    parser.add_argument("--timeout", type=float, default=2)
+    parser.add_argument("--crc-error-rate", type=float, default=0)
+    parser.add_argument("--nak-rate", type=float, default=0)
+    parser.add_argument("--timeout-rate", type=float, default=0)
+    parser.add_argument("--parallel-units", type=int, default=0)
+    parser.add_argument("--cycle-budget", type=float, default=0, help="poll cycle budget in seconds (0 disables it)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+
+    for model in args.model or sorted(RECORDINGS):
+        await run(model, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
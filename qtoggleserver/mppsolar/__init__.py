@@ -1,7 +1,8 @@
 from .bluetooth import BluetoothMPPSolarInverter
+from .fleet import MPPSolarFleet
 from .serial import SerialMPPSolarInverter
 
 
-__all__ = ["BluetoothMPPSolarInverter", "SerialMPPSolarInverter"]
+__all__ = ["BluetoothMPPSolarInverter", "MPPSolarFleet", "SerialMPPSolarInverter"]
 
 VERSION = "0.0.0"
@@ -1,9 +1,14 @@
 import abc
+import asyncio
+import functools
 import logging
 import struct
 
+from collections.abc import Callable
 from typing import Any
 
+import bleak
+
 from qtoggleserver.lib import ble
 
 from . import constants
@@ -30,120 +35,253 @@ class StringPort(mppsolarports.StringPort, BluetoothPort):
     pass
 
 
+class Field:
+    # A value found in a characteristic; raw values are divided by `scale`, or passed through `converter`, if given
+    def __init__(
+        self,
+        name: str,
+        *,
+        type_: str | None = None,
+        scale: float = 1,
+        unit: str | None = None,
+        display_name: str | None = None,
+        converter: Callable[[int], Property] | None = None,
+        choices: list[tuple[Property, str]] | None = None,
+    ) -> None:
+        self.name: str = name
+        self.type: str = type_ or ("float" if scale != 1 else "int")
+        self.scale: float = scale
+        self.unit: str | None = unit
+        self.display_name: str | None = display_name
+        self.converter: Callable[[int], Property] | None = converter
+        self.choices: list[tuple[Property, str]] | None = choices
+
+    def make_port_args(self) -> dict[str, Any]:
+        port_args = {
+            "property_name": self.name,
+            "display_name": self.display_name,
+            "writable": False,
+        }
+        if self.type == "bool":
+            port_args["driver"] = BooleanPort
+        elif self.type == "str":
+            port_args["driver"] = StringPort
+        else:
+            port_args["driver"] = NumberPort
+            port_args["unit"] = self.unit
+        if self.choices:
+            port_args["choices"] = [{"value": c[0], "display_name": c[1]} for c in self.choices]
+
+        return port_args
+
+
+class CharacteristicLayout:
+    # Describes the values of a characteristic, in order; `None` fields are skipped
+    def __init__(self, fmt: str, fields: list[Field | None]) -> None:
+        self.struct: struct.Struct = struct.Struct(fmt)
+        self.fields: list[Field] = [f for f in fields if f]
+
+        # Precompute what to do with each value, so that decoding doesn't have to look at fields again
+        self._items: list[tuple[str, int, float | None, Callable[[int], Property] | None]] = [
+            (field.name, index, field.scale if field.scale != 1 else None, field.converter)
+            for index, field in enumerate(fields)
+            if field
+        ]
+
+    def decode_into(self, data: bytes, properties: dict[str, Property]) -> None:
+        values = self.struct.unpack(data)
+        for name, index, scale, convert in self._items:
+            value = values[index]
+            if convert is not None:
+                properties[name] = convert(value)
+            elif scale is None:
+                properties[name] = value
+            else:
+                properties[name] = value / scale
+
+
 class BluetoothMPPSolarInverter(MPPSolarInverter, ble.BLEPeripheral):
     STATUS1_HANDLE = 0x001D
     STATUS2_HANDLE = 0x0020
     PV1_STATUS_HANDLE = 0x0042
 
+    LAYOUTS = {
+        STATUS1_HANDLE: CharacteristicLayout(
+            "<HHHHHHHHHH",
+            [
+                Field("grid_voltage", scale=10, unit="V", display_name="Grid Voltage"),
+                Field("grid_frequency", scale=10, unit="Hz", display_name="Grid Frequency"),
+                Field("ac_output_voltage", scale=10, unit="V", display_name="AC Output Voltage"),
+                Field("ac_output_frequency", scale=10, unit="Hz", display_name="AC Output Frequency"),
+                Field("ac_output_apparent_power", unit="VA", display_name="AC Output Apparent Power"),
+                Field("ac_output_active_power", unit="W", display_name="AC Output Active Power"),
+                Field("ac_output_load", unit="%", display_name="AC Output Load"),
+                Field("bus_voltage", unit="V", display_name="Bus Voltage"),
+                Field("battery_voltage", scale=100, unit="V", display_name="Battery Voltage"),
+                Field("battery_charging_current", unit="A", display_name="Battery Charging Current"),
+            ],
+        ),
+        STATUS2_HANDLE: CharacteristicLayout(
+            "<HHHHHHHHHH",
+            [
+                Field("battery_state_of_charge", unit="%", display_name="Battery State Of Charge"),
+                Field("heat_sink_temperature", unit="C", display_name="Heat Sink Temperature"),
+                None,
+                None,
+                None,
+                None,
+                Field("mode", type_="str", converter=chr, display_name="Inverter Mode", choices=constants.MODE_CHOICES),
+                None,
+                None,
+                None,
+            ],
+        ),
+        PV1_STATUS_HANDLE: CharacteristicLayout(
+            "<HHHHHHHHHH",
+            [
+                None,
+                None,
+                None,
+                None,
+                None,
+                Field("pv_current", scale=10, unit="A", display_name="PV Current"),
+                Field("pv_voltage", scale=10, unit="V", display_name="PV Voltage"),
+                Field("pv_power", unit="W", display_name="PV Power"),
+                None,
+                None,
+            ],
+        ),
+    }
+
     logger = logging.getLogger(__name__)
 
+    def __init__(self, *, use_notifications: bool = False, **kwargs) -> None:
+        self._use_notifications: bool = use_notifications
+        self._client: bleak.BleakClient | None = None
+        self._notifying: bool = False
+
+        super().__init__(**kwargs)
+
+    def make_client(self, timeout: int) -> bleak.BleakClient:
+        return bleak.BleakClient(self._address, timeout=timeout)
+
     async def read_properties(self) -> None:
-        data = await self.read(self.STATUS1_HANDLE)
-        self.parse_status1_data(data)
+        if self._use_notifications:
+            # Once subscribed, properties are updated as notifications arrive
+            await self._run_cmd(self._subscribe)
+            if self._notifying:
+                # Notifications only come with changes, so the last notified values stay current for as long as the
+                # subscription is alive
+                names = (field.name for layout in self.LAYOUTS.values() for field in layout.fields)
+                self.update_properties({name: self._properties[name] for name in names if name in self._properties})
+                return
+
+            responses = await self._run_cmd(self._read_handles_connected, handles=list(self.LAYOUTS))
+        else:
+            responses = await self._run_cmd(self._read_handles, handles=list(self.LAYOUTS))
+
+        for handle, data in zip(self.LAYOUTS, responses):
+            self.parse_data(handle, data)
 
-        data = await self.read(self.STATUS2_HANDLE)
-        self.parse_status2_data(data)
+    async def _read_handles(self, handles: list[int], timeout: int) -> list[bytes]:
+        # All characteristics are read over a single connection, with their requests issued concurrently
+        self.debug("connecting")
+        async with self.make_client(timeout) as client:
+            responses = await self._read_handles_with_client(client, handles)
+        self.debug("disconnected")
 
-        data = await self.read(self.PV1_STATUS_HANDLE)
-        self.parse_pv1_status_data(data)
+        return responses
+
+    async def _read_handles_connected(self, handles: list[int], timeout: int) -> list[bytes]:
+        try:
+            return await self._read_handles_with_client(self._client, handles)
+        except Exception:
+            await self.disconnect()
+            raise
+
+    async def _read_handles_with_client(self, client: bleak.BleakClient, handles: list[int]) -> list[bytes]:
+        self.debug("reading from %s", ", ".join(f"{h:04X}" for h in handles))
+        responses = await asyncio.gather(*(client.read_gatt_char(h) for h in handles))
+        responses = [bytes(r) for r in responses]
+        for handle, response in zip(handles, responses):
+            self.debug("got response from %04X: %s", handle, self.pretty_data(response))
+
+        return responses
+
+    async def _subscribe(self, timeout: int) -> None:
+        if self._client and self._client.is_connected:
+            return
+
+        await self.disconnect()
+        self.debug("connecting")
+        self._client = self.make_client(timeout)
+        await self._client.connect()
+
+        try:
+            for handle in self.LAYOUTS:
+                self.debug("subscribing to notifications on %04X", handle)
+                await self._client.start_notify(handle, functools.partial(self._handle_notification, handle))
+        except bleak.exc.BleakError as e:
+            self.warning("notifications not available, falling back to reading: %s", e)
+            self._notifying = False
+            return
+        except Exception:
+            await self.disconnect()
+            raise
+
+        self._notifying = True
+
+        # Notifications only come with changes; read current values right away
+        responses = await self._read_handles_connected(list(self.LAYOUTS), timeout)
+        for handle, data in zip(self.LAYOUTS, responses):
+            self.parse_data(handle, data)
+
+    def _handle_notification(self, handle: int, sender: Any, data: bytearray) -> None:
+        data = bytes(data)
+        self.debug("got notification on %04X: %s", handle, self.pretty_data(data))
+        try:
+            self.parse_data(handle, data)
+        except Exception as e:
+            self.error("failed to parse notification on %04X: %s", handle, e)
+
+    async def disconnect(self) -> None:
+        client, self._client = self._client, None
+        self._notifying = False
+        if client is None:
+            return
+
+        self.debug("disconnecting")
+        try:
+            await client.disconnect()
+        except Exception as e:
+            self.warning("failed to disconnect: %s", e)
+
+    async def handle_disable(self) -> None:
+        await super().handle_disable()
+        await self.disconnect()
+
+    async def handle_cleanup(self) -> None:
+        await self.disconnect()
+        await super().handle_cleanup()
 
     async def set_property(self, name: str, value: Property) -> None:
         pass  # TODO: implement me
 
-    def parse_status1_data(self, data: bytes) -> None:
-        (
-            grid_voltage,
-            grid_frequency,
-            ac_output_voltage,
-            ac_output_frequency,
-            ac_output_apparent_power,
-            ac_output_active_power,
-            ac_output_load,
-            bus_voltage,
-            battery_voltage,
-            battery_charging_current,
-        ) = struct.unpack("<HHHHHHHHHH", data)
-
-        self._properties["grid_voltage"] = grid_voltage / 10
-        self._properties["grid_frequency"] = grid_frequency / 10
-        self._properties["ac_output_voltage"] = ac_output_voltage / 10
-        self._properties["ac_output_frequency"] = ac_output_frequency / 10
-        self._properties["ac_output_apparent_power"] = ac_output_apparent_power
-        self._properties["ac_output_active_power"] = ac_output_active_power
-        self._properties["ac_output_load"] = ac_output_load
-        self._properties["bus_voltage"] = bus_voltage
-        self._properties["battery_voltage"] = battery_voltage / 100
-        self._properties["battery_charging_current"] = battery_charging_current
-
-    def parse_status2_data(self, data: bytes) -> None:
-        battery_soc, heat_sink_temp, _, _, _, _, mode, _, _, _ = struct.unpack("<HHHHHHHHHH", data)
-
-        self._properties["battery_state_of_charge"] = battery_soc
-        self._properties["heat_sink_temperature"] = heat_sink_temp
-        self._properties["mode"] = chr(mode)
-
-    def parse_pv1_status_data(self, data: bytes) -> None:
-        _, _, _, _, _, pv_current, pv_voltage, pv_power, _, _ = struct.unpack("<HHHHHHHHHH", data)
-
-        self._properties["pv_current"] = pv_current / 10
-        self._properties["pv_voltage"] = pv_voltage / 10
-        self._properties["pv_power"] = pv_power
+    def parse_data(self, handle: int, data: bytes) -> None:
+        values = {}
+        self.LAYOUTS[handle].decode_into(data, values)
+        self.update_properties(values)
 
     async def make_port_args(self) -> list[dict[str, Any]]:
-        return [
-            {"driver": NumberPort, "property_name": "grid_voltage", "display_name": "Grid Voltage", "unit": "V"},
-            {"driver": NumberPort, "property_name": "grid_frequency", "display_name": "Grid Frequency", "unit": "Hz"},
-            {
-                "driver": NumberPort,
-                "property_name": "ac_output_voltage",
-                "display_name": "AC Output Voltage",
-                "unit": "V",
-            },
-            {
-                "driver": NumberPort,
-                "property_name": "ac_output_frequency",
-                "display_name": "AC Output Frequency",
-                "unit": "Hz",
-            },
-            {
-                "driver": NumberPort,
-                "property_name": "ac_output_apparent_power",
-                "display_name": "AC Output Apparent Power",
-                "unit": "VA",
-            },
-            {
-                "driver": NumberPort,
-                "property_name": "ac_output_active_power",
-                "display_name": "AC Output Active Power",
-                "unit": "W",
-            },
-            {"driver": NumberPort, "property_name": "ac_output_load", "display_name": "AC Output Load", "unit": "%"},
-            {"driver": NumberPort, "property_name": "battery_voltage", "display_name": "Battery Voltage", "unit": "V"},
-            {
-                "driver": NumberPort,
-                "property_name": "battery_charging_current",
-                "display_name": "Battery Charging Current",
-                "unit": "A",
-            },
-            {
-                "driver": NumberPort,
-                "property_name": "battery_state_of_charge",
-                "display_name": "Battery State Of Charge",
-                "unit": "%",
-            },
-            {
-                "driver": NumberPort,
-                "property_name": "heat_sink_temperature",
-                "display_name": "Heat Sink Temperature",
-                "unit": "C",
-            },
-            {
-                "driver": StringPort,
-                "property_name": "mode",
-                "display_name": "Inverter Mode",
-                "choices": [{"value": c[0], "display_name": c[1]} for c in constants.MODE_CHOICES],
-            },
-            {"driver": NumberPort, "property_name": "pv_current", "display_name": "PV Current", "unit": "A"},
-            {"driver": NumberPort, "property_name": "pv_voltage", "display_name": "PV Voltage", "unit": "V"},
-            {"driver": NumberPort, "property_name": "pv_power", "display_name": "PV Power", "unit": "W"},
-        ]
+        port_args_list = []
+        for layout in self.LAYOUTS.values():
+            for field in layout.fields:
+                port_args = field.make_port_args()
+                if port_args["driver"] is NumberPort:
+                    port_args.update(self.get_port_deadband_args(field.name))
+                port_args_list.append(port_args)
+
+        port_args_list += self.make_energy_port_args(port_args_list)
+        port_args_list += self.make_aggregate_port_args(port_args_list)
+
+        return port_args_list
@@ -0,0 +1,62 @@
+from typing import Any
+
+from .exceptions import MPPSolarException
+
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half-open"
+
+STATES = (STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN)
+
+
+class CircuitOpenError(MPPSolarException):
+    pass
+
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` consecutive failures, so that calls are skipped. After `reset_timeout` seconds,
+    # one call is let through (half-open): if it succeeds, the breaker closes, otherwise it opens again. A zero
+    # threshold disables the breaker.
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self._failure_threshold: int = failure_threshold
+        self._reset_timeout: float = reset_timeout
+        self._opened_time: float = 0
+        self.state: str = STATE_CLOSED
+        self.consecutive_failures: int = 0
+        self.trips: int = 0
+        self.skips: int = 0
+
+    def allow(self, now: float) -> bool:
+        if self.state == STATE_OPEN:
+            if now - self._opened_time < self._reset_timeout:
+                self.skips += 1
+                return False
+
+            self.state = STATE_HALF_OPEN
+
+        return True
+
+    def record_success(self) -> None:
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self, now: float) -> None:
+        self.consecutive_failures += 1
+        if not self._failure_threshold:
+            return
+
+        if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self._failure_threshold:
+            if self.state != STATE_OPEN:
+                self.trips += 1
+            self.state = STATE_OPEN
+            self._opened_time = now
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "skips": self.skips,
+        }
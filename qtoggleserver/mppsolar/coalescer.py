@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from collections.abc import Awaitable, Callable
+
+from .typing import Properties, Property
+
+
+class WriteCoalescer:
+    # Collects property writes that arrive within `window` seconds of each other into a single batch, keeping only the
+    # last value written for each property. A batch is never delayed by more than `MAX_WINDOWS` windows.
+
+    MAX_WINDOWS = 3
+
+    def __init__(self, apply: Callable[[Properties], Awaitable[None]], window: float) -> None:
+        self._apply: Callable[[Properties], Awaitable[None]] = apply
+        self._window: float = window
+        self._pending: Properties = {}
+        self._batch_result: asyncio.Future | None = None
+        self._batch_start_time: float = 0
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._apply_lock: asyncio.Lock = asyncio.Lock()
+        self._apply_tasks: set[asyncio.Task] = set()
+
+    async def write(self, name: str, value: Property) -> None:
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        if self._batch_result is None:
+            self._batch_result = loop.create_future()
+            self._batch_start_time = now
+
+        self._pending[name] = value
+
+        if self._flush_handle:
+            self._flush_handle.cancel()
+        delay = min(self._window, self._batch_start_time + self._window * self.MAX_WINDOWS - now)
+        self._flush_handle = loop.call_later(max(delay, 0), self._flush)
+
+        await asyncio.shield(self._batch_result)
+
+    def cancel(self) -> None:
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if self._batch_result and not self._batch_result.done():
+            self._batch_result.cancel()
+
+        self._pending = {}
+        self._batch_result = None
+
+    def _flush(self) -> None:
+        values, result = self._pending, self._batch_result
+        self._pending = {}
+        self._batch_result = None
+        self._flush_handle = None
+
+        task = asyncio.create_task(self._apply_batch(values, result))
+        self._apply_tasks.add(task)
+        task.add_done_callback(self._apply_tasks.discard)
+
+    async def _apply_batch(self, values: Properties, result: asyncio.Future) -> None:
+        # Batches are applied one after the other, so that each of them sees the values written by the previous one
+        async with self._apply_lock:
+            try:
+                await self._apply(values)
+            except Exception as e:
+                if not result.done():
+                    result.set_exception(e)
+                    result.exception()  # writers may have gone away; don't report it as unretrieved
+            else:
+                if not result.done():
+                    result.set_result(None)
@@ -14,6 +14,7 @@ from .psdv import PSDV
 from .qmchgcr import QMCHGCR
 from .qmod import QMOD
 from .qmuchgcr import QMUCHGCR
+from .qpgs import QPGS
 from .qpigs import QPIGS_GKMK, QPIGS_LV, QPIGS_MAX
 from .qpigs2 import QPIGS2_MAX
 from .qpiri import QPIRI_GK, QPIRI_MAX, QPIRI_MK
@@ -90,5 +91,16 @@ COMMANDS_BY_MODEL = {
 }
 
 
+# Commands querying the status of each unit of a parallel system, given its number
+PARALLEL_STATUS_COMMANDS_BY_MODEL = {
+    "MAX": QPGS,
+    "MK": QPGS,
+}
+
+
 def get_command_classes(model: str) -> list[type[Command]]:
     return COMMANDS_BY_MODEL.get(model, [])
+
+
+def get_parallel_status_command_class(model: str) -> type[Command] | None:
+    return PARALLEL_STATUS_COMMANDS_BY_MODEL.get(model)
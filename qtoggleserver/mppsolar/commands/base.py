@@ -1,4 +1,3 @@
-import ctypes
 import re
 
 from ..exceptions import MPPSolarException
@@ -8,6 +7,21 @@ from ..typing import Properties, PropertyDefinitions
 SUFFIXES = ("__choices",)
 
 
+def _make_crc_table() -> tuple[int, ...]:
+    # CRC-XMODEM (polynomial 0x1021), one entry per byte value
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+
+    return tuple(table)
+
+
+_CRC_TABLE = _make_crc_table()
+
+
 class CommandException(MPPSolarException):
     pass
 
@@ -16,6 +30,104 @@ class ResponseError(CommandException):
     pass
 
 
+class CRCError(ResponseError):
+    pass
+
+
+class NAKError(ResponseError):
+    pass
+
+
+def _parse_int(value: bytes) -> int:
+    # Accepts only what the regex-based parser does (`-?[0-9]+`); int() alone would also take e.g. "+1" or "1_0"
+    digits = value[1:] if value[:1] == b"-" else value
+    if not digits.isdigit():
+        raise ValueError()
+
+    return int(value)
+
+
+def _parse_float(value: bytes) -> float:
+    # Likewise, `-?[0-9.]+`, leaving out e.g. "nan", "inf" or "1e3"
+    digits = value[1:] if value[:1] == b"-" else value
+    if not digits or digits.strip(b"0123456789."):
+        raise ValueError()
+
+    return float(value)
+
+
+class ResponseDecoder:
+    # Decodes a response payload by position, using converters precomputed from a response format. Each
+    # whitespace-separated token of the format is either a single field or a run of single-character boolean fields.
+
+    _BOOL_VALUES = {b"0": False, b"1": True}
+    _BIT_VALUES = {0x30: False, 0x31: True}
+    _CONVERTERS = {"d": _parse_int, "f": _parse_float, "s": bytes.decode, "b": _BOOL_VALUES.__getitem__}
+
+    def __init__(self, tokens: list[tuple[str | tuple[str, ...], ...]], is_list: bool) -> None:
+        # Tokens are `(name, converter)` for single fields and `(names, None)` for runs of boolean fields
+        self._tokens: list[tuple[str | tuple[str, ...], ...]] = tokens
+        self._is_list: bool = is_list
+
+    @classmethod
+    def compile(cls, response_fmt: str) -> "ResponseDecoder | None":
+        is_list = False
+        if response_fmt.endswith("..."):
+            is_list = True
+            response_fmt = response_fmt[:-3]
+        response_fmt = re.sub("|".join(SUFFIXES), "", response_fmt)
+
+        tokens = []
+        for token_fmt in response_fmt.split():
+            if not re.fullmatch(r"({[^:{}]+:[dfbs]})+", token_fmt):
+                return None  # literal text inside token
+
+            fields = re.findall(r"{([^:]+):([dfbs])}", token_fmt)
+            if len(fields) == 1:
+                name, type_ = fields[0]
+                tokens.append((name, cls._CONVERTERS[type_]))
+            elif all(type_ == "b" for _, type_ in fields):
+                tokens.append((tuple(name for name, _ in fields), None))
+            else:
+                return None  # fields of different types glued together
+
+        if is_list and (len(tokens) != 1 or tokens[0][1] is None):
+            return None
+
+        return cls(tokens, is_list)
+
+    def decode(self, payload: bytes) -> Properties:
+        values = payload.split()
+        try:
+            # Like with the regex-based parsing, values must start right away, and so must end list values
+            if payload[:1].isspace() or (self._is_list and payload[-1:].isspace()):
+                raise ValueError()
+
+            if self._is_list:
+                if not values:
+                    raise ValueError()
+
+                name, convert = self._tokens[0]
+                return {name: [convert(value) for value in values]}
+
+            # Like with the regex-based parsing, trailing values that aren't part of the format are ignored
+            if len(values) < len(self._tokens):
+                raise ValueError()
+
+            parsed_dict = {}
+            for value, (name, convert) in zip(values, self._tokens):
+                if convert is not None:
+                    parsed_dict[name] = convert(value)
+                elif len(value) == len(name):
+                    parsed_dict.update(zip(name, map(self._BIT_VALUES.__getitem__, value)))
+                else:
+                    raise ValueError()
+        except (ValueError, KeyError, UnicodeDecodeError):
+            raise ResponseError(f"Unexpected response format: {payload.decode(errors='replace')}") from None
+
+        return parsed_dict
+
+
 class Command:
     REQUEST_FMT = ""
     RESPONSE_FMT = ""
@@ -24,10 +136,14 @@ class Command:
     DISPLAY_NAMES = {}
     CHOICES = {}
     REQUEST_DEFAULT_VALUES = {}
+    POLL_INTERVAL: int | None = 0  # seconds; 0 means every poll, None means only once, at startup
+    POLL_RANK = 1  # lower ranks are polled first; rank 0 commands are never deferred when a poll cycle runs late
 
-    _TYPE_MAP = {"int": int, "float": float, "bool": bool, "str": str}
+    _TYPE_MAP = {"int": int, "float": float, "bool": lambda value: value == "1", "str": str}
 
     _response_regex: tuple[re.Pattern | None, re.Pattern] | None = None
+    _response_decoder: ResponseDecoder | None
+    _request: bytes
     _request_property_definitions: PropertyDefinitions | None = None
     _response_property_definitions: PropertyDefinitions | None = None
 
@@ -39,8 +155,16 @@ class Command:
         return cls.__name__.split("_")[0]
 
     def prepare_request(self) -> bytes:
-        message = self.REQUEST_FMT.format(**self._params)
-        return message.encode() + self.compute_crc(message) + b"\r"
+        # Requests without parameters always result in the same frame, so it's computed only once per class
+        cls = type(self)
+        request = cls.__dict__.get("_request")
+        if request is None:
+            message = self.REQUEST_FMT.format(**self._params).encode()
+            request = message + self.compute_crc(message) + b"\r"
+            if "{" not in self.REQUEST_FMT:
+                cls._request = request
+
+        return request
 
     def parse_response(self, response: bytes) -> Properties:
         if not response.startswith(b"("):
@@ -49,44 +173,61 @@ class Command:
         if not response.endswith(b"\r"):
             raise ResponseError(f"Unexpected response end: {response}")
 
-        response = response[:-1]  # get rid of terminal '\r'
+        frame = response[:-3]  # get rid of CRC and terminal '\r'
+        crc = response[-3:-1]
+        if self.compute_crc(frame) != crc:
+            raise CRCError(f"Wrong CRC: {frame.decode(errors='replace')} {repr(crc)[2:-1]}")
 
-        crc = response[-2:]
-        response = response[:-2].decode()
-        if self.compute_crc(response) != crc:
-            raise ResponseError(f"Wrong CRC: {response} {repr(crc)[2:-1]}")
+        payload = frame[1:]  # get rid of start byte '('
+        if payload == b"NAK":
+            raise NAKError(f"Command {self.get_name()} not acknowledged")
 
-        response = response[1:]  # get rid of start byte '('
+        decoder = self.get_response_decoder()
+        if decoder is not None:
+            parsed_dict = decoder.decode(payload)
+        else:
+            try:
+                payload_str = payload.decode()
+            except UnicodeDecodeError:
+                raise ResponseError(f"Unexpected response format: {payload.decode(errors='replace')}") from None
+            parsed_dict = self.parse_payload_regex(payload_str)
 
-        split_pat, values_pat = self.get_response_regex()
+        # Add virtual properties
+        for name, details in self.VIRTUAL_PROPERTIES.items():
+            if not details:
+                continue  # property disabled in command subclass
+            if name in parsed_dict:
+                continue  # property already present
+
+            parsed_dict[name] = details["value"](parsed_dict)
+
+        return parsed_dict
+
+    @classmethod
+    def parse_payload_regex(cls, payload: str) -> Properties:
+        split_pat, values_pat = cls.get_response_regex()
         if split_pat:
-            parts = split_pat.split(response)
+            parts = split_pat.split(payload)
         else:
-            parts = [response]
+            parts = [payload]
 
         parsed_dict = {}
         for part in parts:
             match = values_pat.match(part)
             if not match:
-                raise ResponseError(f"Unexpected response format: {response}")
+                raise ResponseError(f"Unexpected response format: {payload}")
 
             for name, value in match.groupdict().items():
                 type_, name = name.split("_", 1)
-                parsed_value = self._TYPE_MAP[type_](value)
+                try:
+                    parsed_value = cls._TYPE_MAP[type_](value)
+                except ValueError:
+                    raise ResponseError(f"Unexpected response format: {payload}") from None
                 if split_pat:
                     parsed_dict.setdefault(name, []).append(parsed_value)
                 else:
                     parsed_dict[name] = parsed_value
 
-        # Add virtual properties
-        for name, details in self.VIRTUAL_PROPERTIES.items():
-            if not details:
-                continue  # property disabled in command subclass
-            if name in parsed_dict:
-                continue  # property already present
-
-            parsed_dict[name] = details["value"](parsed_dict)
-
         return parsed_dict
 
     @classmethod
@@ -150,48 +291,30 @@ class Command:
             pat = re.sub(r"{([^:]+):f}", "(?P<float_\\1>-?[0-9.]+)", pat)
             pat = re.sub(r"{([^:]+):b}", "(?P<bool_\\1>[01])", pat)
             pat = re.sub(r"{([^:]+):s}", "(?P<str_\\1>[^\\\\s]+)", pat)
+            pat += r"(?!\S)"  # the last value ends at whitespace or at the end of the payload
             cls._response_regex = (re.compile(r"\s+") if is_list else None, re.compile(pat))
 
         return cls._response_regex
 
+    @classmethod
+    def get_response_decoder(cls) -> ResponseDecoder | None:
+        # Look up the cache in the class itself, as decoders must not be inherited from a parent command class
+        if "_response_decoder" not in cls.__dict__:
+            cls._response_decoder = ResponseDecoder.compile(cls.RESPONSE_FMT)
+
+        return cls._response_decoder
+
     @staticmethod
-    def compute_crc(message: str) -> bytes:
-        crc = 0
-        crc_ta = [
-            0x0000,
-            0x1021,
-            0x2042,
-            0x3063,
-            0x4084,
-            0x50A5,
-            0x60C6,
-            0x70E7,
-            0x8108,
-            0x9129,
-            0xA14A,
-            0xB16B,
-            0xC18C,
-            0xD1AD,
-            0xE1CE,
-            0xF1EF,
-        ]
+    def compute_crc(message: str | bytes) -> bytes:
+        if isinstance(message, str):
+            message = message.encode()
 
+        crc = 0
         for c in message:
-            c = ord(c)
-
-            t_da = ctypes.c_uint8(crc >> 8)
-            da = t_da.value >> 4
-            crc <<= 4
-            index = da ^ (c >> 4)
-            crc ^= crc_ta[index]
-            t_da = ctypes.c_uint8(crc >> 8)
-            da = t_da.value >> 4
-            crc <<= 4
-            index = da ^ (c & 0x0F)
-            crc ^= crc_ta[index]
-
-        crc_low = ctypes.c_uint8(crc).value
-        crc_high = ctypes.c_uint8(crc >> 8).value
+            crc = ((crc << 8) & 0xFFFF) ^ _CRC_TABLE[(crc >> 8) ^ c]
+
+        crc_low = crc & 0xFF
+        crc_high = crc >> 8
 
         if crc_low in (0x28, 0x0D, 0x0A):
             crc_low += 1
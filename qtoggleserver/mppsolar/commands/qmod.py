@@ -6,6 +6,7 @@ from .base import Command
 class QMOD(Command):
     REQUEST_FMT = "QMOD"
     RESPONSE_FMT = "{mode:s}"
+    POLL_RANK = 0
 
     DISPLAY_NAMES = {"mode": "Inverter Mode"}
 
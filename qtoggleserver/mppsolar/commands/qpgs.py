@@ -0,0 +1,95 @@
+from qtoggleserver.mppsolar import constants
+
+from .base import Command
+
+
+class QPGS(Command):
+    REQUEST_FMT = "QPGS{_parallel_no:d}"
+    REQUEST_DEFAULT_VALUES = {"_parallel_no": 0}
+
+    RESPONSE_FMT = (
+        "{_is_present:b} "
+        "{_serial_number:s} "
+        "{mode:s} "
+        "{fault_code:d} "
+        "{grid_voltage:f} "
+        "{grid_frequency:f} "
+        "{ac_output_voltage:f} "
+        "{ac_output_frequency:f} "
+        "{ac_output_apparent_power:f} "
+        "{ac_output_active_power:f} "
+        "{ac_output_load:f} "
+        "{battery_voltage:f} "
+        "{battery_charging_current:f} "
+        "{battery_state_of_charge:f} "
+        "{pv_voltage:f} "
+        "{_total_charging_current:f} "
+        "{_total_ac_output_apparent_power:f} "
+        "{_total_ac_output_active_power:f} "
+        "{_total_ac_output_load:f} "
+        "{is_scc_ok:b}"
+        "{is_ac_charging:b}"
+        "{is_scc_charging:b}"
+        "{_battery_status_high:b}"
+        "{_battery_status_low:b}"
+        "{is_grid_lost:b}"
+        "{has_load:b}"
+        "{_is_configuration_changed:b} "
+        "{_output_mode:d} "
+        "{_charging_source_priority:d} "
+        "{_max_charging_current:d} "
+        "{_max_charging_range:d} "
+        "{_max_grid_charging_current:d} "
+        "{pv_current:f} "
+        "{battery_discharging_current:f}"
+    )
+
+    UNITS = {
+        "ac_output_active_power": "W",
+        "ac_output_apparent_power": "VA",
+        "ac_output_frequency": "Hz",
+        "ac_output_load": "%",
+        "ac_output_voltage": "V",
+        "battery_charging_current": "A",
+        "battery_discharging_current": "A",
+        "battery_state_of_charge": "%",
+        "battery_voltage": "V",
+        "grid_frequency": "Hz",
+        "grid_voltage": "V",
+        "pv_current": "A",
+        "pv_power": "W",
+        "pv_voltage": "V",
+    }
+
+    DISPLAY_NAMES = {
+        "mode": "Inverter Mode",
+        "fault_code": "Fault Code",
+        "ac_output_active_power": "AC Output Active Power",
+        "ac_output_apparent_power": "AC Output Apparent Power",
+        "ac_output_frequency": "AC Output Frequency",
+        "ac_output_load": "AC Output Load",
+        "ac_output_voltage": "AC Output Voltage",
+        "battery_charging_current": "Battery Charging Current",
+        "battery_discharging_current": "Battery Discharging Current",
+        "battery_state_of_charge": "Battery State Of Charge",
+        "battery_voltage": "Battery Voltage",
+        "grid_frequency": "Grid Frequency",
+        "grid_voltage": "Grid Voltage",
+        "has_load": "Has Load",
+        "is_ac_charging": "AC Charging",
+        "is_grid_lost": "Grid Lost",
+        "is_scc_charging": "SCC Charging",
+        "is_scc_ok": "SCC OK",
+        "pv_current": "PV Current",
+        "pv_power": "PV Power",
+        "pv_voltage": "PV Voltage",
+    }
+
+    CHOICES = {"mode": constants.MODE_CHOICES}
+
+    VIRTUAL_PROPERTIES = {
+        "pv_power": {
+            "value": lambda properties: properties.get("pv_current", 0) * properties.get("pv_voltage", 0),
+            "type": "float",
+        },
+    }
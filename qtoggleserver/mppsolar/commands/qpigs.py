@@ -3,6 +3,7 @@ from .base import Command
 
 class QPIGS(Command):
     REQUEST_FMT = "QPIGS"
+    POLL_RANK = 0
 
     RESPONSE_FMT = (
         "{grid_voltage:f} "
@@ -5,6 +5,7 @@ from .base import Command
 
 class QPIRI(Command):
     REQUEST_FMT = "QPIRI"
+    POLL_INTERVAL = 60  # settings only change when written
 
     UNITS = {
         "battery_back_to_charging_voltage": "V",
@@ -0,0 +1,9 @@
+from .base import Command
+
+
+class QVFW(Command):
+    REQUEST_FMT = "QVFW"
+    RESPONSE_FMT = "VERFW:{firmware_version:s}"
+    POLL_INTERVAL = None
+
+    DISPLAY_NAMES = {"firmware_version": "Firmware Version"}
@@ -0,0 +1,77 @@
+from collections.abc import Callable
+
+from .typing import Property
+
+
+def _get_pv_power(properties: dict[str, Property]) -> float | None:
+    pv_power = properties.get("pv_power")
+    if pv_power is not None:
+        return pv_power
+
+    # MAX models report each PV input separately
+    powers = [properties.get("pv1_power"), properties.get("pv2_power")]
+    powers = [p for p in powers if p is not None]
+    return sum(powers) if powers else None
+
+
+def _make_product_power(voltage_name: str, current_name: str) -> Callable[[dict[str, Property]], float | None]:
+    def get_power(properties: dict[str, Property]) -> float | None:
+        voltage = properties.get(voltage_name)
+        current = properties.get(current_name)
+        if voltage is None or current is None:
+            return None
+
+        return voltage * current
+
+    return get_power
+
+
+ENERGY_PROPERTIES = {
+    "pv_energy": {
+        "display_name": "PV Energy",
+        "sources": (("pv_power",), ("pv1_power",)),
+        "power": _get_pv_power,
+    },
+    "pv_charging_energy": {
+        "display_name": "PV Charging Energy",
+        "sources": (("pv_charging_power",),),
+        "power": lambda properties: properties.get("pv_charging_power"),
+    },
+    "ac_output_energy": {
+        "display_name": "AC Output Energy",
+        "sources": (("ac_output_active_power",),),
+        "power": lambda properties: properties.get("ac_output_active_power"),
+    },
+    "battery_charging_energy": {
+        "display_name": "Battery Charging Energy",
+        "sources": (("battery_voltage", "battery_charging_current"),),
+        "power": _make_product_power("battery_voltage", "battery_charging_current"),
+    },
+    "battery_discharging_energy": {
+        "display_name": "Battery Discharging Energy",
+        "sources": (("battery_voltage", "battery_discharging_current"),),
+        "power": _make_product_power("battery_voltage", "battery_discharging_current"),
+    },
+}
+
+
+class EnergyIntegrator:
+    # Accumulates energy, in Wh, out of power samples using the trapezoidal rule. Gaps longer than `max_gap` seconds
+    # (e.g. while the inverter can't be reached) are not integrated over, since the power in between is unknown.
+
+    def __init__(self, max_gap: float, energy: float = 0) -> None:
+        self._max_gap: float = max_gap
+        self._last_time: float | None = None
+        self._last_power: float = 0
+        self.energy: float = energy
+
+    def add(self, time_: float, power: float) -> None:
+        if self._last_time is not None and 0 < time_ - self._last_time <= self._max_gap:
+            self.energy += (self._last_power + power) * (time_ - self._last_time) / 7200
+
+        self._last_time = time_
+        self._last_power = power
+
+    def interrupt(self) -> None:
+        # Called when a power sample is missing, so that the next one starts over instead of bridging the gap
+        self._last_time = None
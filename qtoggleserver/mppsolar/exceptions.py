@@ -4,3 +4,11 @@ class MPPSolarException(Exception):
 
 class MPPSolarTimeout(MPPSolarException):
     pass
+
+
+class MPPSolarIOUnavailable(MPPSolarException):
+    pass
+
+
+class MPPSolarLinkDown(MPPSolarIOUnavailable):
+    pass
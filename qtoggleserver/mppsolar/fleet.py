@@ -0,0 +1,223 @@
+import asyncio
+import logging
+
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .exceptions import MPPSolarException
+from .inverter import MPPSolarInverter
+from .ports import NumberPort
+from .serial import SerialMPPSolarInverter
+from .tracing import Tracer, dump_chrome_trace
+from .typing import Property
+
+
+class MPPSolarFleet(MPPSolarInverter):
+    # Drives several serial inverters as a single peripheral, polling them concurrently (at most `max_concurrency` at a
+    # time) with their start times spread over the poll interval, so that they don't all burst at the same moment.
+    # Inverter properties are exposed as `<inverter>.<property>`, next to fleet-wide aggregated properties.
+
+    DEFAULT_MAX_CONCURRENCY = 4
+    STAGGER_FRACTION = 0.5  # of the poll interval, over which inverter poll start times are spread
+
+    # Each aggregated property sums, for each inverter, the first group of source properties that has any value
+    AGGREGATED_PROPERTIES = {
+        "total_pv_power": {
+            "sources": (("pv_power",), ("pv1_power", "pv2_power")),
+            "display_name": "Total PV Power",
+            "unit": "W",
+        },
+        "total_ac_output_active_power": {
+            "sources": (("ac_output_active_power",),),
+            "display_name": "Total Load",
+            "unit": "W",
+        },
+        "total_ac_output_apparent_power": {
+            "sources": (("ac_output_apparent_power",),),
+            "display_name": "Total Apparent Load",
+            "unit": "VA",
+        },
+    }
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        *,
+        inverters: list[dict[str, Any]],
+        model: str = "",
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        stagger_interval: float | None = None,
+        **kwargs,
+    ) -> None:
+        self._max_concurrency: int = max_concurrency
+        self._stagger_interval: float | None = stagger_interval
+        self._inverters: dict[str, SerialMPPSolarInverter] = {}
+        self._capabilities_changed: bool = False
+
+        super().__init__(model=model, **kwargs)
+
+        for i, inverter_args in enumerate(inverters):
+            inverter_args = dict(inverter_args)
+            name = inverter_args.pop("name", None) or f"inverter{i + 1}"
+            if name in self._inverters:
+                raise MPPSolarException(f"Duplicate inverter name {name}")
+
+            inverter_args.setdefault("model", model)
+            self._inverters[name] = self.make_inverter(name, inverter_args)
+            self._inverters[name].set_default_cycle_budget(self.get_poll_interval())
+
+    def make_inverter(self, name: str, inverter_args: dict[str, Any]) -> SerialMPPSolarInverter:
+        return SerialMPPSolarInverter(params=inverter_args, name=f"{self.get_id()}.{name}", **inverter_args)
+
+    def get_inverters(self) -> dict[str, SerialMPPSolarInverter]:
+        return dict(self._inverters)
+
+    def get_stats(self) -> dict[str, Any]:
+        return {name: inverter.get_stats() for name, inverter in self._inverters.items()}
+
+    def dump_trace(self, path: str) -> None:
+        # Writes the spans recorded by all inverters as a single Chrome trace, with one track per inverter
+        tracers = [inverter.get_tracer() for inverter in self._inverters.values()]
+        tracers = [tracer for tracer in tracers if isinstance(tracer, Tracer)]
+        if not tracers:
+            raise MPPSolarException("Tracing is not enabled")
+
+        dump_chrome_trace(tracers, path)
+
+    def set_poll_interval(self, interval: int) -> None:
+        super().set_poll_interval(interval)
+
+        # Inverters are polled along with the fleet, so their poll cycles are budgeted by its interval
+        for inverter in self._inverters.values():
+            inverter.set_default_cycle_budget(interval)
+
+    def get_stagger_interval(self) -> float:
+        if self._stagger_interval is not None:
+            return self._stagger_interval
+
+        return self.get_poll_interval() * self.STAGGER_FRACTION / max(len(self._inverters), 1)
+
+    async def _run_staggered(self, func: Callable[[SerialMPPSolarInverter], Awaitable[Any]]) -> dict[str, Any]:
+        # Calls `func` with each inverter, returning results (or exceptions) by inverter name
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        stagger_interval = self.get_stagger_interval()
+
+        async def run(index: int, inverter: SerialMPPSolarInverter) -> Any:
+            await asyncio.sleep(index * stagger_interval)
+            async with semaphore:
+                return await func(inverter)
+
+        results = await asyncio.gather(
+            *(run(i, inverter) for i, inverter in enumerate(self._inverters.values())), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+
+        return dict(zip(self._inverters, results))
+
+    async def _refresh_and_read_inverter(self, inverter: SerialMPPSolarInverter) -> None:
+        # Capabilities loaded from cache are checked within the same staggered slot as the first read
+        if await inverter.refresh_capabilities():
+            self._capabilities_changed = True
+        await inverter.read_properties()
+
+    async def read_properties(self) -> None:
+        results = await self._run_staggered(self._refresh_and_read_inverter)
+        errors = [e for e in results.values() if isinstance(e, Exception)]
+        for name, result in results.items():
+            inverter = self._inverters[name]
+            if isinstance(result, Exception):
+                self.error("failed to read inverter %s: %s", name, result)
+            else:
+                await inverter.update_energy()
+                inverter.record_history()
+            inverter.clear_refreshed_properties()
+
+        self._update_aggregated_properties()
+
+        if self._capabilities_changed:
+            self._capabilities_changed = False
+            await self.update_ports()
+
+        if errors and len(errors) == len(results):
+            raise errors[0]
+
+    def _update_aggregated_properties(self) -> None:
+        for name, details in self.AGGREGATED_PROPERTIES.items():
+            total = None
+            for inverter in self._inverters.values():
+                for source_names in details["sources"]:
+                    values = [inverter.get_property(n) for n in source_names]
+                    values = [v for v in values if v is not None]
+                    if values:
+                        total = (total or 0) + sum(values)
+                        break
+
+            if total is None:
+                self._properties.pop(name, None)
+            else:
+                self.update_properties({name: total})
+
+    def _split_property_name(self, name: str) -> tuple[SerialMPPSolarInverter | None, str]:
+        inverter_name, _, property_name = name.partition(".")
+        return self._inverters.get(inverter_name), property_name
+
+    def get_property(self, name: str) -> Property | None:
+        inverter, property_name = self._split_property_name(name)
+        if inverter:
+            return inverter.get_property(property_name)
+
+        return super().get_property(name)
+
+    async def set_property(self, name: str, value: Property) -> None:
+        inverter, property_name = self._split_property_name(name)
+        if not inverter:
+            raise MPPSolarException(f"Property {name} is not writable")
+
+        await inverter.set_property(property_name, value)
+
+    async def handle_disable(self) -> None:
+        await super().handle_disable()
+        for inverter in self._inverters.values():
+            inverter.close_io()
+            await inverter.save_energy()
+
+    async def handle_cleanup(self) -> None:
+        await super().handle_cleanup()
+        for inverter in self._inverters.values():
+            await inverter.handle_cleanup()
+
+    async def make_port_args(self) -> list[dict[str, Any]]:
+        results = await self._run_staggered(lambda inverter: inverter.make_port_args())
+        errors = [e for e in results.values() if isinstance(e, Exception)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+
+        port_args_list = []
+        for name, result in results.items():
+            if isinstance(result, Exception):
+                self.error("failed to make ports of inverter %s: %s", name, result)
+                continue
+
+            for port_args in result:
+                port_args = dict(port_args, property_name=f"{name}.{port_args['property_name']}")
+                if port_args.get("display_name"):
+                    port_args["display_name"] = f"{port_args['display_name']} ({name})"
+                port_args_list.append(port_args)
+
+        for name, details in self.AGGREGATED_PROPERTIES.items():
+            port_args = {
+                "driver": NumberPort,
+                "property_name": name,
+                "display_name": details["display_name"],
+                "writable": False,
+                "unit": details["unit"],
+            }
+            port_args.update(self.get_port_deadband_args(name))
+            port_args_list.append(port_args)
+
+        port_args_list += self.make_aggregate_port_args(port_args_list)
+
+        return port_args_list
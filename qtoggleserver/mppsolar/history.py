@@ -0,0 +1,117 @@
+import array
+import collections
+
+
+AGGREGATE_FUNCTIONS = ("mean", "min", "max", "last")
+
+
+class History:
+    # Keeps the last `capacity` samples of a property in preallocated arrays, used as a ring buffer. Samples are
+    # addressed by sequence number, which keeps increasing as samples are added.
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity: int = capacity
+        self._times: array.array = array.array("d", bytes(8 * capacity))
+        self._values: array.array = array.array("d", bytes(8 * capacity))
+        self._next_seq: int = 0
+
+    def append(self, time_: float, value: float) -> int:
+        seq = self._next_seq
+        index = seq % self._capacity
+        self._times[index] = time_
+        self._values[index] = value
+        self._next_seq += 1
+
+        return seq
+
+    def get_capacity(self) -> int:
+        return self._capacity
+
+    def get_first_seq(self) -> int:
+        return max(self._next_seq - self._capacity, 0)
+
+    def get_next_seq(self) -> int:
+        return self._next_seq
+
+    def get_time(self, seq: int) -> float:
+        return self._times[seq % self._capacity]
+
+    def get_value(self, seq: int) -> float:
+        return self._values[seq % self._capacity]
+
+    def get_samples(self) -> list[tuple[float, float]]:
+        return [(self.get_time(seq), self.get_value(seq)) for seq in range(self.get_first_seq(), self._next_seq)]
+
+
+class WindowAggregate:
+    # Maintains the mean, min, max and last value of the samples of a history that are at most `window` seconds old,
+    # updating them incrementally: a running sum for the mean and monotonic queues of sequence numbers for min and max.
+    # Samples that are about to be overwritten in the history's ring buffer fall out of the window.
+
+    def __init__(self, history: History, window: float) -> None:
+        self._history: History = history
+        self._window: float = window
+        self._start_seq: int = history.get_next_seq()
+        self._end_seq: int = self._start_seq
+        self._sum: float = 0
+        self._min_seqs: collections.deque[int] = collections.deque()
+        self._max_seqs: collections.deque[int] = collections.deque()
+
+    def evict_overwritten(self) -> None:
+        # Must be called before each sample is appended to the history, while the value it overwrites in the ring
+        # buffer can still be subtracted from the sum
+        history = self._history
+        if self._start_seq < self._end_seq and self._start_seq <= history.get_next_seq() - history.get_capacity():
+            self._drop_first()
+
+    def add(self, seq: int) -> None:
+        # Must be called for each sample appended to the history, in order
+        history = self._history
+        self.expire(history.get_time(seq))
+
+        value = history.get_value(seq)
+        self._sum += value
+
+        while self._min_seqs and history.get_value(self._min_seqs[-1]) >= value:
+            self._min_seqs.pop()
+        self._min_seqs.append(seq)
+
+        while self._max_seqs and history.get_value(self._max_seqs[-1]) <= value:
+            self._max_seqs.pop()
+        self._max_seqs.append(seq)
+
+        self._end_seq = seq + 1
+
+    def expire(self, now: float) -> None:
+        history = self._history
+        start_time = now - self._window
+        while self._start_seq < self._end_seq and history.get_time(self._start_seq) < start_time:
+            self._drop_first()
+
+    def _drop_first(self) -> None:
+        seq = self._start_seq
+        self._sum -= self._history.get_value(seq)
+        if self._min_seqs[0] == seq:
+            self._min_seqs.popleft()
+        if self._max_seqs[0] == seq:
+            self._max_seqs.popleft()
+        self._start_seq += 1
+
+        if self._start_seq == self._end_seq:
+            self._sum = 0  # don't let rounding errors accumulate over an empty window
+
+    def get_count(self) -> int:
+        return self._end_seq - self._start_seq
+
+    def get_value(self, function: str) -> float | None:
+        if self._start_seq == self._end_seq:
+            return None
+
+        if function == "mean":
+            return self._sum / (self._end_seq - self._start_seq)
+        elif function == "min":
+            return self._history.get_value(self._min_seqs[0])
+        elif function == "max":
+            return self._history.get_value(self._max_seqs[0])
+        else:  # last
+            return self._history.get_value(self._end_seq - 1)
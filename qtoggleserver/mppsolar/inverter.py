@@ -1,9 +1,18 @@
 import abc
+import cProfile
 import logging
+import pstats
+import time
+
+from typing import Any
 
 from qtoggleserver.lib.polled import PolledPeripheral
 
-from .exceptions import MPPSolarTimeout
+from qtoggleserver import persist
+
+from .energy import ENERGY_PROPERTIES, EnergyIntegrator
+from .exceptions import MPPSolarException, MPPSolarTimeout
+from .history import AGGREGATE_FUNCTIONS, History, WindowAggregate
 from .typing import Property
 
 
@@ -13,26 +22,302 @@ class MPPSolarInverter(PolledPeripheral, metaclass=abc.ABCMeta):
     DEFAULT_RETRY_COUNT = 2
 
     TIMEOUT = 10
+    DEFAULT_HISTORY_SIZE = 720  # samples
+    TRACE_DUMP_INTERVAL = 60  # seconds
 
     logger = logging.getLogger(__name__)
 
-    def __init__(self, *, model: str, **kwargs) -> None:
+    def __init__(
+        self,
+        *,
+        model: str,
+        port_deadbands: dict[str, dict[str, float]] | None = None,
+        history_size: int = 0,
+        aggregates: dict[str, dict[str, float | list[float]]] | None = None,
+        energy_ports: bool = False,
+        energy_max_gap: float = 300,
+        energy_persist_interval: float = 300,
+        profile_poll_cycles: int = 0,
+        profile_path: str | None = None,
+        trace_path: str | None = None,
+        **kwargs,
+    ) -> None:
         self._model: str = model
+        self._port_deadbands: dict[str, dict[str, float]] = port_deadbands or {}
         self._properties: dict[str, Property] = {}
+        self._refreshed_property_names: set[str] = set()
+        self._port_args_by_id: dict[str, dict[str, Any]] = {}
+        self._history_size: int = history_size
+        self._histories: dict[str, History] = {}
+        self._window_aggregates: dict[str, dict[float, WindowAggregate]] = {}
+        self._aggregate_properties: dict[str, tuple[str, str, float]] = {}
+        self._energy_ports: bool = energy_ports
+        self._energy_max_gap: float = energy_max_gap
+        self._energy_persist_interval: float = energy_persist_interval
+        self._energy_integrators: dict[str, EnergyIntegrator] | None = None
+        self._energy_save_time: float = 0
+        self._profiler: cProfile.Profile | None = None
+        self._profile_remaining_cycles: int = 0
+        self._profile_path: str = ""
+        self._trace_path: str | None = trace_path
+        self._trace_dump_time: float = 0
 
         super().__init__(**kwargs)
 
+        if profile_poll_cycles and profile_path:
+            self.profile_poll_cycles(profile_poll_cycles, profile_path)
+
+        # Configured as e.g. `{ac_output_active_power = {mean = [60, 900], max = 300}}`, with windows in seconds
+        for name, windows_by_function in (aggregates or {}).items():
+            for function, windows in windows_by_function.items():
+                if function not in AGGREGATE_FUNCTIONS:
+                    raise MPPSolarException(f"Unknown aggregate function {function}")
+                if not isinstance(windows, list):
+                    windows = [windows]
+
+                if name not in self._histories:
+                    self._histories[name] = History(self._history_size or self.DEFAULT_HISTORY_SIZE)
+                window_aggregates = self._window_aggregates.setdefault(name, {})
+                for window in windows:
+                    if window not in window_aggregates:
+                        window_aggregates[window] = WindowAggregate(self._histories[name], window)
+                    self._aggregate_properties[f"{name}_{function}_{window:g}s"] = (name, function, window)
+
     async def read_properties(self) -> None:
         raise NotImplementedError
 
     async def poll(self) -> None:
+        profiler = self._profiler
+        if profiler:
+            profiler.enable()
         try:
             await self.read_properties()
+            await self.update_energy()
+            self.record_history()
         except TimeoutError as e:
             raise MPPSolarTimeout("Timeout reading inverter status") from e
+        finally:
+            self.clear_refreshed_properties()
+            if profiler:
+                profiler.disable()
+                self._profile_remaining_cycles -= 1
+                if self._profile_remaining_cycles <= 0:
+                    self._write_profile()
+            if self._trace_path and time.monotonic() >= self._trace_dump_time:
+                self._write_trace()
+
+    def profile_poll_cycles(self, count: int, path: str) -> None:
+        # Profiles the next `count` poll cycles and writes the report to `path`. Anything else that runs on the event
+        # loop while a cycle awaits IO is profiled as well.
+        self._profiler = cProfile.Profile()
+        self._profile_remaining_cycles = count
+        self._profile_path = path
+
+    def _write_profile(self) -> None:
+        profiler, self._profiler = self._profiler, None
+        try:
+            with open(self._profile_path, "w") as f:
+                pstats.Stats(profiler, stream=f).sort_stats(pstats.SortKey.CUMULATIVE).print_stats()
+        except OSError as e:
+            self.error("failed to write profile report to %s: %s", self._profile_path, e)
+        else:
+            self.info("profile report written to %s", self._profile_path)
+
+    def dump_trace(self, path: str) -> None:
+        raise MPPSolarException("Tracing is not supported")
+
+    def _write_trace(self) -> None:
+        self._trace_dump_time = time.monotonic() + self.TRACE_DUMP_INTERVAL
+        try:
+            self.dump_trace(self._trace_path)
+        except Exception as e:
+            self.error("failed to write trace to %s: %s", self._trace_path, e)
+
+    async def handle_disable(self) -> None:
+        await super().handle_disable()
+        await self.save_energy()
+
+    async def handle_cleanup(self) -> None:
+        await super().handle_cleanup()
+        await self.save_energy()
+
+    async def update_energy(self) -> None:
+        # Integrates the power values refreshed by the current poll cycle into the energy counters, saving them every
+        # now and then so that they survive restarts
+        if not self._energy_ports:
+            return
+
+        if self._energy_integrators is None:
+            await self._load_energy()
+            if self._energy_integrators is None:
+                return
+
+        # Values of failed commands stay in place, but the power they'd give is unknown and not integrated over
+        now = time.monotonic()
+        refreshed_properties = {name: self._properties.get(name) for name in self._refreshed_property_names}
+        for name, integrator in self._energy_integrators.items():
+            power = ENERGY_PROPERTIES[name]["power"](refreshed_properties)
+            if power is not None:
+                integrator.add(now, power)
+                self.update_properties({name: integrator.energy})
+            else:
+                integrator.interrupt()
+
+        if now - self._energy_save_time >= self._energy_persist_interval:
+            await self.save_energy()
+
+    async def _load_energy(self) -> None:
+        try:
+            energy_by_name = await persist.get_value(self._get_energy_persist_name(), {})
+        except Exception as e:
+            # Starting from zero would overwrite the saved counters, so just try again next time
+            self.error("failed to load energy counters: %s", e, exc_info=True)
+            return
+
+        self._energy_integrators = {
+            name: EnergyIntegrator(self._energy_max_gap, energy_by_name.get(name, 0)) for name in ENERGY_PROPERTIES
+        }
+        self._energy_save_time = time.monotonic()
+        for name, energy in energy_by_name.items():
+            if name in ENERGY_PROPERTIES:
+                self._properties[name] = energy
+
+    async def save_energy(self) -> None:
+        if self._energy_integrators is None:
+            return
+
+        self._energy_save_time = time.monotonic()
+        energy_by_name = {name: integrator.energy for name, integrator in self._energy_integrators.items()}
+        try:
+            await persist.set_value(self._get_energy_persist_name(), energy_by_name)
+        except Exception as e:
+            self.error("failed to save energy counters: %s", e, exc_info=True)
+
+    def _get_energy_persist_name(self) -> str:
+        return f"mppsolar_energy_{self.get_id()}"
+
+    def make_energy_port_args(self, port_args_list: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        if not self._energy_ports:
+            return []
+
+        port_args_by_name = {port_args["property_name"]: port_args for port_args in port_args_list}
+        energy_port_args_list = []
+        for name, details in ENERGY_PROPERTIES.items():
+            for source_names in details["sources"]:
+                if all(n in port_args_by_name for n in source_names):
+                    break
+            else:
+                continue
+
+            energy_port_args = {
+                # Energy ports are numeric, just like the power ports they are derived from
+                "driver": port_args_by_name[source_names[0]]["driver"],
+                "property_name": name,
+                "display_name": details["display_name"],
+                "writable": False,
+                "unit": "Wh",
+            }
+            energy_port_args.update(self.get_port_deadband_args(name))
+            energy_port_args_list.append(energy_port_args)
+
+        return energy_port_args_list
+
+    def update_properties(self, values: dict[str, Property]) -> None:
+        # Sets properties refreshed by the current poll cycle; only these are sampled into history, since the others
+        # (e.g. those of failed or less frequently polled commands) still hold older values
+        self._properties.update(values)
+        self._refreshed_property_names.update(values)
+
+    def clear_refreshed_properties(self) -> None:
+        self._refreshed_property_names.clear()
+
+    def record_history(self) -> None:
+        # Samples the refreshed values of numeric properties: all of them if a history size is configured, otherwise
+        # only those that are aggregated
+        if not self._histories and not self._history_size:
+            return
+
+        now = time.time()
+        sampled_names = set()
+        for name in self._refreshed_property_names:
+            value = self._properties.get(name)
+            if not isinstance(value, int | float) or isinstance(value, bool) or name in self._aggregate_properties:
+                continue
+
+            history = self._histories.get(name)
+            if history is None:
+                if not self._history_size:
+                    continue
+                history = self._histories[name] = History(self._history_size)
+
+            window_aggregates = self._window_aggregates.get(name, {}).values()
+            for window_aggregate in window_aggregates:
+                window_aggregate.evict_overwritten()
+            seq = history.append(now, value)
+            sampled_names.add(name)
+            for window_aggregate in window_aggregates:
+                window_aggregate.add(seq)
+
+        # Properties that weren't read this time still need their old samples expired
+        for name, window_aggregates in self._window_aggregates.items():
+            if name not in sampled_names:
+                for window_aggregate in window_aggregates.values():
+                    window_aggregate.expire(now)
+
+        for aggregate_name, (name, function, window) in self._aggregate_properties.items():
+            self._properties[aggregate_name] = self._window_aggregates[name][window].get_value(function)
+
+    def get_history(self, name: str) -> list[tuple[float, float]]:
+        # Returns `(timestamp, value)` samples of a property, oldest first
+        history = self._histories.get(name)
+        return history.get_samples() if history else []
+
+    def make_aggregate_port_args(self, port_args_list: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        port_args_by_name = {port_args["property_name"]: port_args for port_args in port_args_list}
+        aggregate_port_args_list = []
+        for aggregate_name, (name, function, window) in self._aggregate_properties.items():
+            port_args = port_args_by_name.get(name)
+            if port_args is None or port_args["driver"].TYPE != "number" or port_args.get("choices"):
+                self.warning("cannot aggregate non-numeric or unknown property %s", name)
+                continue
+
+            display_name = port_args.get("display_name") or name
+            aggregate_port_args = {
+                "driver": port_args["driver"],
+                "property_name": aggregate_name,
+                "display_name": f"{display_name} ({function.capitalize()} {window:g}s)",
+                "writable": False,
+                "unit": port_args.get("unit"),
+            }
+            aggregate_port_args.update(self.get_port_deadband_args(aggregate_name))
+            aggregate_port_args_list.append(aggregate_port_args)
+
+        return aggregate_port_args_list
+
+    async def get_port_args(self) -> list[dict[str, Any]]:
+        port_args_list = await super().get_port_args()
+        self._port_args_by_id = {port_args["property_name"]: port_args for port_args in port_args_list}
+
+        return port_args_list
+
+    async def update_ports(self) -> None:
+        # Adds, removes and replaces ports so that they match freshly made port args
+        old_port_args_by_id = self._port_args_by_id
+        await self.get_port_args()
+
+        for id_, port_args in old_port_args_by_id.items():
+            if self._port_args_by_id.get(id_) != port_args and self.get_port(id_):
+                await self.remove_port(id_)
+        for id_, port_args in self._port_args_by_id.items():
+            if old_port_args_by_id.get(id_) != port_args:
+                await self.add_port(port_args)
 
     def get_property(self, name: str) -> Property | None:
         return self._properties.get(name)
 
     async def set_property(self, name: str, value: Property) -> None:
         raise NotImplementedError
+
+    def get_port_deadband_args(self, name: str) -> dict[str, Any]:
+        # Configured as e.g. `{grid_voltage = {deadband_absolute = 1, min_publish_interval = 30}}`
+        return dict(self._port_deadbands.get(name, {}))
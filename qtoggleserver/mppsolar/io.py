@@ -1,11 +1,16 @@
 import abc
 import asyncio
 import os
+import time
 
 import serial
 
 
 class BaseIO(metaclass=abc.ABCMeta):
+    READ_POLL_INTERVAL = 0.1  # seconds
+
+    _first_byte_delay: float | None = None
+
     @abc.abstractmethod
     def read_available(self) -> bytes:
         raise NotImplementedError
@@ -14,17 +19,130 @@ class BaseIO(metaclass=abc.ABCMeta):
     def write(self, data: bytes) -> None:
         raise NotImplementedError
 
-    async def read(self, timeout: int) -> bytes:
+    def fileno(self) -> int | None:
+        # IO implementations that can be watched for readability by the event loop return their file descriptor here
+        return None
+
+    async def read(
+        self, timeout: float, first_byte_timeout: float | None = None, inter_byte_timeout: float | None = None
+    ) -> bytes:
+        # Reads a frame, giving up after `timeout` seconds in total, after `first_byte_timeout` seconds without any byte
+        # or after `inter_byte_timeout` seconds without any new byte once the response started
+        self._first_byte_delay = None
+        fd = self.fileno()
+        if fd is None:
+            return await self.read_polled(timeout, first_byte_timeout, inter_byte_timeout)
+        else:
+            return await self.read_when_ready(fd, timeout, first_byte_timeout, inter_byte_timeout)
+
+    def _get_read_deadline(
+        self,
+        start_time: float,
+        last_byte_time: float | None,
+        timeout: float,
+        first_byte_timeout: float | None,
+        inter_byte_timeout: float | None,
+    ) -> float:
+        deadline = start_time + timeout
+        if last_byte_time is None:
+            if first_byte_timeout is not None:
+                deadline = min(deadline, start_time + first_byte_timeout)
+        elif inter_byte_timeout is not None:
+            deadline = min(deadline, last_byte_time + inter_byte_timeout)
+
+        return deadline
+
+    async def read_polled(
+        self, timeout: float, first_byte_timeout: float | None = None, inter_byte_timeout: float | None = None
+    ) -> bytes:
+        start_time = time.monotonic()
+        last_byte_time = None
         data = b""
-        for _ in range(timeout * 10):
-            data += self.read_available()
-            if data.endswith(b"\r"):
+        while True:
+            chunk = self.read_available()
+            now = time.monotonic()
+            if chunk:
+                if self._first_byte_delay is None:
+                    self._first_byte_delay = now - start_time
+                last_byte_time = now
+                data += chunk
+                if data.endswith(b"\r"):
+                    break
+
+            deadline = self._get_read_deadline(
+                start_time, last_byte_time, timeout, first_byte_timeout, inter_byte_timeout
+            )
+            if now >= deadline:
                 break
 
-            await asyncio.sleep(0.1)
+            await asyncio.sleep(min(self.READ_POLL_INTERVAL, deadline - now))
 
         return data
 
+    async def read_when_ready(
+        self, fd: int, timeout: float, first_byte_timeout: float | None = None, inter_byte_timeout: float | None = None
+    ) -> bytes:
+        loop = asyncio.get_running_loop()
+        start_time = time.monotonic()
+        last_byte_time = None
+        data = bytearray()
+        frame_read = loop.create_future()
+
+        def on_readable() -> None:
+            nonlocal last_byte_time
+
+            if frame_read.done():
+                return
+
+            try:
+                chunk = self.read_available()
+            except Exception as e:
+                frame_read.set_exception(e)
+                return
+
+            # A readable file descriptor without anything to read has reached its end, e.g. the device was unplugged;
+            # left alone, it would keep the event loop calling back until the deadline
+            if not chunk:
+                frame_read.set_exception(OSError("Device disconnected"))
+                return
+
+            last_byte_time = time.monotonic()
+            if self._first_byte_delay is None:
+                self._first_byte_delay = last_byte_time - start_time
+
+            data.extend(chunk)
+            if b"\r" in chunk:
+                frame_read.set_result(None)
+
+        loop.add_reader(fd, on_readable)
+        try:
+            # The deadline moves as bytes come in, so it's checked again each time it's reached
+            while not frame_read.done():
+                deadline = self._get_read_deadline(
+                    start_time, last_byte_time, timeout, first_byte_timeout, inter_byte_timeout
+                )
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                await asyncio.wait([frame_read], timeout=remaining)
+
+            if frame_read.done():
+                frame_read.result()  # raises read errors
+        finally:
+            loop.remove_reader(fd)
+
+        # A frame ends with the first '\r'; anything past it isn't part of the response
+        end = data.find(b"\r")
+        if end >= 0:
+            del data[end + 1 :]
+
+        return bytes(data)
+
+    def get_first_byte_delay(self) -> float | None:
+        # How long the last read waited for the first byte of the response, if any came
+        return self._first_byte_delay
+
     @abc.abstractmethod
     def close(self) -> None:
         raise NotImplementedError
@@ -35,11 +153,17 @@ class HIDRawIO(BaseIO):
         self._fd: int = os.open(device_path, flags=os.O_RDWR | os.O_NONBLOCK)
 
     def read_available(self) -> bytes:
-        return os.read(self._fd, 1024)
+        try:
+            return os.read(self._fd, 1024)
+        except BlockingIOError:
+            return b""
 
     def write(self, data: bytes) -> None:
         os.write(self._fd, data)
 
+    def fileno(self) -> int | None:
+        return self._fd
+
     def close(self) -> None:
         os.close(self._fd)
 
@@ -58,5 +182,8 @@ class SerialIO(BaseIO):
     def write(self, data: bytes) -> None:
         self._serial.write(data)
 
+    def fileno(self) -> int | None:
+        return self._serial.fileno()
+
     def close(self) -> None:
         self._serial.close()
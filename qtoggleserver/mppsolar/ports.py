@@ -1,14 +1,45 @@
 import abc
+import time
 
 from typing import Any, cast
 
 from qtoggleserver.core import ports as core_ports
-from qtoggleserver.core.typing import NullablePortValue, PortValue
+from qtoggleserver.core.typing import AttributeDefinitions, NullablePortValue, PortValue
 from qtoggleserver.lib.polled import PolledPort
 
 from .inverter import MPPSolarInverter
 
 
+DEADBAND_ATTRDEFS = {
+    "deadband_absolute": {
+        "display_name": "Absolute Deadband",
+        "description": "Changes smaller than this are not published (set to 0 to disable).",
+        "type": "number",
+        "modifiable": True,
+        "min": 0,
+    },
+    "deadband_relative": {
+        "display_name": "Relative Deadband",
+        "description": "Changes smaller than this percent of the last published value are not published "
+        "(set to 0 to disable).",
+        "type": "number",
+        "modifiable": True,
+        "unit": "%",
+        "min": 0,
+        "max": 100,
+    },
+    "min_publish_interval": {
+        "display_name": "Minimum Publish Interval",
+        "description": "How often, at most, to publish a new value (set to 0 to disable).",
+        "type": "number",
+        "modifiable": True,
+        "integer": True,
+        "unit": "seconds",
+        "min": 0,
+    },
+}
+
+
 class MPPSolarPort(PolledPort, metaclass=abc.ABCMeta):
     def __init__(self, *, property_name: str, display_name: str, writable: bool, **kwargs) -> None:
         self._property_name: str = property_name
@@ -39,11 +70,61 @@ class BooleanPort(MPPSolarPort):
 class NumberPort(MPPSolarPort):
     TYPE = "number"
 
-    def __init__(self, *, unit: str | None = None, choices: list[dict[str, Any]] | None = None, **kwargs) -> None:
+    def __init__(
+        self,
+        *,
+        unit: str | None = None,
+        choices: list[dict[str, Any]] | None = None,
+        deadband_absolute: float = 0,
+        deadband_relative: float = 0,
+        min_publish_interval: int = 0,
+        **kwargs,
+    ) -> None:
         super().__init__(**kwargs)
 
         self._unit: str | None = unit
         self._choices: list[dict[str, Any]] | None = choices
+        self._deadband_absolute: float = deadband_absolute
+        self._deadband_relative: float = deadband_relative
+        self._min_publish_interval: int = min_publish_interval
+        self._published_value: NullablePortValue = None
+        self._published_time: float = 0
+
+    def has_deadband(self) -> bool:
+        # Only measurements are filtered; settings and choices must show what was written right away
+        return not self._writable and not self._choices
+
+    async def get_additional_attrdefs(self) -> AttributeDefinitions:
+        attrdefs = await super().get_additional_attrdefs()
+        if self.has_deadband():
+            attrdefs = dict(attrdefs, **DEADBAND_ATTRDEFS)
+
+        return attrdefs
+
+    async def read_value(self) -> NullablePortValue:
+        # Noisy values are held at the last published value as long as they stay within the deadband, so that they
+        # don't generate a value change on each poll
+        value = await super().read_value()
+        if not self.has_deadband():
+            return value
+
+        if value is None or self._published_value is None:
+            self._published_value = value
+            self._published_time = time.monotonic()
+            return value
+
+        now = time.monotonic()
+        if now - self._published_time < self._min_publish_interval:
+            return self._published_value
+
+        delta = abs(value - self._published_value)
+        if delta <= self._deadband_absolute or delta * 100 <= abs(self._published_value) * self._deadband_relative:
+            return self._published_value
+
+        self._published_value = value
+        self._published_time = now
+
+        return value
 
 
 class StringPort(MPPSolarPort):
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import random
+
+from collections.abc import Iterable
+
+from .commands.base import Command
+from .io import BaseIO
+
+
+# Typical inverter responses, by model and request (without CRC and terminal '\r'); requests that aren't
+# recorded are answered with ACK if they're setters and NAK otherwise
+RECORDINGS = {
+    "GK": {
+        b"QPIGS": b"230.0 50.0 230.0 50.0 0575 0510 011 375 52.90 012 088 0034 04.1 245.6 00.00 00000 00010110 00 00 "
+        b"01007 010",
+        b"QPIRI": b"230.0 21.7 230.0 50.0 21.7 5000 5000 48.0 46.0 42.0 56.4 54.0 2 30 060 0 2 3 9 01 0 0 52.0 0 1",
+        b"QMOD": b"B",
+        b"QMCHGCR": b"010 020 030 040 050 060 070 080 090 100",
+        b"QMUCHGCR": b"002 010 020 030 040 050 060",
+        b"QVFW": b"VERFW:00072.70",
+    },
+    "LV": {
+        b"QPIGS": b"230.0 50.0 230.0 50.0 0575 0510 011 375 52.90 012 088 0034 04.1 245.6 00.00 00000 0010110 00 00 "
+        b"01007 010",
+        b"QMOD": b"L",
+        b"QMCHGCR": b"010 020 030 040 050 060 070 080",
+        b"QVFW": b"VERFW:00052.30",
+    },
+    "MAX": {
+        b"QPIGS": b"231.2 49.9 230.1 50.0 0920 0874 013 404 53.10 020 095 0041 06.7 312.4 53.12 00000 00110110 00 00 "
+        b"02093 010",
+        b"QPIGS2": b"05.1 298.7 01523",
+        b"QPIRI": b"230.0 47.8 230.0 50.0 47.8 11000 11000 48.0 47.0 44.0 56.4 54.0 2 030 150 0 2 3 9 01 0 0 52.0 0 1 "
+        b"480 0 000",
+        b"QMOD": b"L",
+        b"QMCHGCR": b"010 020 030 040 050 060 070 080 090 100 110 120 130 140 150 160",
+        b"QMUCHGCR": b"002 010 020 030 040 050 060 070 080 090 100 110 120",
+        b"QVFW": b"VERFW:00005.17",
+        b"QPGS0": b"1 92932004102443 L 00 231.2 49.9 230.1 50.0 0920 0874 013 53.1 020 095 312.4 040 01840 01748 013 "
+        b"10100010 1 1 060 080 30 06.7 000",
+        b"QPGS1": b"1 92932004102444 L 00 231.0 49.9 230.0 50.0 0920 0874 013 53.1 020 095 305.8 040 01840 01748 013 "
+        b"10100010 1 1 060 080 30 06.5 000",
+    },
+    "MK": {
+        b"QPIGS": b"229.8 50.0 229.8 50.0 0459 0401 009 390 51.80 000 078 0036 02.3 198.7 00.00 00004 00010000 00 00 "
+        b"00457 010",
+        b"QPIRI": b"230.0 21.7 230.0 50.0 21.7 5000 5000 48.0 46.0 42.0 56.4 54.0 2 30 060 0 2 3 9 01 0 0 52.0 0 1 "
+        b"480 0",
+        b"QMOD": b"B",
+        b"QMCHGCR": b"010 020 030 040 050 060 070 080",
+        b"QVFW": b"VERFW:00073.10",
+        b"QPGS0": b"1 92932004102445 B 00 000.0 00.0 229.8 50.0 0459 0401 009 51.8 000 078 198.7 000 00918 00802 009 "
+        b"10000010 1 2 060 080 10 02.3 004",
+        b"QPGS1": b"1 92932004102446 B 00 000.0 00.0 229.8 50.0 0459 0401 009 51.8 000 078 201.2 000 00918 00802 009 "
+        b"10000010 1 2 060 080 10 02.1 004",
+    },
+}
+
+SETTER_PREFIXES = (b"P", b"M")
+
+
+class ReplayIO(BaseIO):
+    # Emulates an inverter by replaying recorded responses. Responses arrive one byte every `10 / baud` seconds (the
+    # request is transmitted at the same rate), after `processing_time` seconds. CRC errors, NAKs and timeouts are
+    # injected with the given probabilities, and `ignored_requests` are never answered.
+
+    def __init__(
+        self,
+        model: str,
+        *,
+        baud: int | None = None,
+        processing_time: float = 0.01,
+        crc_error_rate: float = 0,
+        nak_rate: float = 0,
+        timeout_rate: float = 0,
+        ignored_requests: Iterable[bytes] = (),
+        seed: int | None = None,
+    ) -> None:
+        self._recordings: dict[bytes, bytes] = RECORDINGS[model]
+        self._byte_time: float = 10 / baud if baud else 0
+        self._processing_time: float = processing_time
+        self._crc_error_rate: float = crc_error_rate
+        self._nak_rate: float = nak_rate
+        self._timeout_rate: float = timeout_rate
+        self._ignored_requests: frozenset[bytes] = frozenset(ignored_requests)
+        self._random: random.Random = random.Random(seed)
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        self._handles: list[asyncio.TimerHandle] = []
+
+    def read_available(self) -> bytes:
+        try:
+            return os.read(self._read_fd, 1024)
+        except BlockingIOError:
+            return b""
+
+    def write(self, data: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        self._handles = [h for h in self._handles if h.when() > loop.time()]
+
+        for request in data.split(b"\r")[:-1]:
+            response = self.make_response(request[:-2])
+            if response is None:
+                continue
+
+            delay = (len(request) + 1) * self._byte_time + self._processing_time
+            if self._byte_time:
+                for i in range(len(response)):
+                    self._send_later(loop, delay + i * self._byte_time, response[i : i + 1])
+            else:
+                self._send_later(loop, delay, response)
+
+    def make_response(self, request: bytes) -> bytes | None:
+        if request in self._ignored_requests or self._random.random() < self._timeout_rate:
+            return None
+
+        payload = self._recordings.get(request)
+        if payload is None:
+            payload = b"ACK" if request.startswith(SETTER_PREFIXES) else b"NAK"
+        if self._random.random() < self._nak_rate:
+            payload = b"NAK"
+
+        message = b"(" + payload
+        if self._random.random() < self._crc_error_rate:
+            crc = Command.compute_crc(message + b" ")  # a valid-looking CRC of something else
+        else:
+            crc = Command.compute_crc(message)
+
+        return message + crc + b"\r"
+
+    def fileno(self) -> int | None:
+        return self._read_fd
+
+    def close(self) -> None:
+        for handle in self._handles:
+            handle.cancel()
+        self._handles = []
+
+        os.close(self._read_fd)
+        os.close(self._write_fd)
+
+    def _send_later(self, loop: asyncio.AbstractEventLoop, delay: float, data: bytes) -> None:
+        self._handles.append(loop.call_later(delay, os.write, self._write_fd, data))
@@ -0,0 +1,102 @@
+import asyncio
+import contextlib
+import time
+
+from collections.abc import AsyncIterator
+from typing import Any
+
+
+PRIORITY_WRITE = 0
+PRIORITY_READBACK = 1
+PRIORITY_POLL = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_WRITE: "write",
+    PRIORITY_READBACK: "readback",
+    PRIORITY_POLL: "poll",
+}
+
+
+class _Request:
+    def __init__(self, priority: int, seq: int) -> None:
+        self.priority: int = priority
+        self.seq: int = seq
+        self.task: asyncio.Task | None = asyncio.current_task()
+        self.enqueue_time: float = time.monotonic()
+        self.granted: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class CommandScheduler:
+    # Grants exclusive access to the inverter bus, one holder at a time, in order of priority (lower values first) and
+    # then in order of arrival. Access is reentrant for the task holding it.
+
+    def __init__(self) -> None:
+        self._waiting: list[_Request] = []
+        self._holder: asyncio.Task | None = None
+        self._seq: int = 0
+        self._max_queue_depth: int = 0
+        self._wait_stats_by_priority: dict[int, dict[str, float]] = {}
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, priority: int) -> AsyncIterator[None]:
+        if self._holder is not None and self._holder is asyncio.current_task():
+            yield
+            return
+
+        request = self._enqueue(priority)
+        await self._wait_granted(request)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "queue_depth": len(self._waiting),
+            "max_queue_depth": self._max_queue_depth,
+            "wait_times": {
+                PRIORITY_NAMES.get(priority, str(priority)): dict(stats)
+                for priority, stats in sorted(self._wait_stats_by_priority.items())
+            },
+        }
+
+    def _enqueue(self, priority: int) -> _Request:
+        self._seq += 1
+        request = _Request(priority, self._seq)
+        self._waiting.append(request)
+        self._max_queue_depth = max(self._max_queue_depth, len(self._waiting))
+        self._grant_next()
+
+        return request
+
+    async def _wait_granted(self, request: _Request) -> None:
+        try:
+            await request.granted
+        except asyncio.CancelledError:
+            if request.granted.done() and not request.granted.cancelled():
+                self._release()  # granted, but cancelled before getting the chance to run
+            elif request in self._waiting:
+                self._waiting.remove(request)
+            raise
+
+    def _grant_next(self) -> None:
+        while self._holder is None and self._waiting:
+            request = min(self._waiting, key=lambda r: (r.priority, r.seq))
+            self._waiting.remove(request)
+            if not request.granted.cancelled():
+                break
+        else:
+            return
+
+        self._holder = request.task
+        request.granted.set_result(None)
+
+        wait_time = time.monotonic() - request.enqueue_time
+        stats = self._wait_stats_by_priority.setdefault(request.priority, {"count": 0, "total": 0, "max": 0})
+        stats["count"] += 1
+        stats["total"] += wait_time
+        stats["max"] = max(stats["max"], wait_time)
+
+    def _release(self) -> None:
+        self._holder = None
+        self._grant_next()
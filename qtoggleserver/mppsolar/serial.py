@@ -1,24 +1,48 @@
 import asyncio
-import contextlib
+import functools
 import logging
 import math
+import random
 import re
+import time
 
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 from qtoggleserver.utils import json as json_utils
 
+from qtoggleserver import persist
+
 from . import commands, constants
+from .breaker import STATE_CLOSED, STATE_HALF_OPEN, STATES, CircuitBreaker, CircuitOpenError
+from .coalescer import WriteCoalescer
+from .commands.base import CRCError, NAKError, ResponseError
+from .commands.qvfw import QVFW
+from .exceptions import MPPSolarException, MPPSolarIOUnavailable, MPPSolarLinkDown, MPPSolarTimeout
 from .inverter import MPPSolarInverter
 from .io import BaseIO, HIDRawIO, SerialIO
 from .ports import BooleanPort, NumberPort, StringPort
+from .replay import RECORDINGS, ReplayIO
+from .scheduler import PRIORITY_NAMES, PRIORITY_POLL, PRIORITY_READBACK, PRIORITY_WRITE, CommandScheduler
+from .stats import BusStats
+from .tracing import NULL_TRACER, NullTracer, Tracer, dump_chrome_trace
 from .typing import Properties, Property
 
 
 class SerialMPPSolarInverter(MPPSolarInverter):
     DEFAULT_BAUD = 2400
     CMD_WAIT = 0.5  # seconds
+    CMD_WAIT_MIN = 0.05  # seconds
+    CMD_WAIT_DECREASE_FACTOR = 0.8
+    CMD_WAIT_INCREASE_FACTOR = 2
     BATTERY_FORCE_WAIT = 5  # seconds
+    IO_REOPEN_BACKOFF_MIN = 1  # seconds
+    IO_REOPEN_BACKOFF_MAX = 60  # seconds
+    FIRST_BYTE_PROCESSING_TIME = 1.5  # seconds
+    FIRST_BYTE_DELAY_FACTOR = 3
+    FIRST_BYTE_DELAY_SMOOTHING = 0.2  # weight of the latest first byte delay in its moving average
+    FIRST_BYTE_TIMEOUT_MAX = 5  # seconds
+    INTER_BYTE_TIMEOUT_MIN = 0.5  # seconds
 
     # Filter out properties that we don't really want exposed
     BLACKLISTED_PROPERTIES = {
@@ -41,6 +65,15 @@ class SerialMPPSolarInverter(MPPSolarInverter):
         "is_scc_firmware_updated",
     }
 
+    # Properties of parallel system units that are summed up into `parallel_total_<property>`
+    PARALLEL_TOTAL_PROPERTIES = (
+        "ac_output_active_power",
+        "ac_output_apparent_power",
+        "battery_charging_current",
+        "battery_discharging_current",
+        "pv_power",
+    )
+
     logger = logging.getLogger(__name__)
 
     def __init__(
@@ -51,6 +84,23 @@ class SerialMPPSolarInverter(MPPSolarInverter):
         blacklist_properties: list[str] | None = None,
         force_battery_discharge_min_soc: int | None = None,
         force_battery_charge_grid_min_voltage: int | None = None,
+        adaptive_cmd_wait: bool = False,
+        command_poll_intervals: dict[str, int | None] | None = None,
+        write_coalesce_window: float = 0,
+        optimistic_writes: bool = False,
+        parallel_units: int | str = 0,
+        diagnostic_ports: bool = False,
+        trace_buffer_size: int = 0,
+        cache_capabilities: bool = True,
+        probe_commands: bool = False,
+        command_retries: int = 1,
+        command_retry_backoff: float = 0.5,
+        breaker_failure_threshold: int = 3,
+        breaker_reset_timeout: float = 60,
+        first_byte_timeout: float | None = None,
+        inter_byte_timeout: float | None = None,
+        dead_link_threshold: int = 3,
+        cycle_budget: float | None = None,
         **kwargs,
     ) -> None:
         self._serial_port: str = serial_port
@@ -58,24 +108,151 @@ class SerialMPPSolarInverter(MPPSolarInverter):
         self._blacklist_properties: set[str] = set(blacklist_properties or [])
         self._force_battery_discharge_min_soc: int | None = force_battery_discharge_min_soc
         self._force_battery_charge_min_grid_voltage: int | None = force_battery_charge_grid_min_voltage
+        self._command_poll_intervals: dict[str, int | None] = command_poll_intervals or {}
         self._setter_command_classes_by_property: dict[str, list[type[commands.Command]]] = {}
+        self._response_command_classes_by_property: dict[str, list[type[commands.Command]]] = {}
+        self._last_poll_time_by_command: dict[str, float] = {}
         self._choices_by_property: dict[str, list[dict[str, Any]]] = {}
-        self._command_lock: asyncio.Lock = asyncio.Lock()
+        self._firmware_version: str | None = None
+        self._cache_capabilities: bool = cache_capabilities
+        self._capabilities_known: bool = False
+        self._capabilities_stale: bool = False
+        self._command_classes: list[type[commands.Command]] = []
+        self._scheduler: CommandScheduler = CommandScheduler()
+        self._io: BaseIO | None = None
+        self._io_read_mode: str = ""
+        self._io_reopen_backoff: float = 0
+        self._io_reopen_time: float = 0
+        self._adaptive_cmd_wait: bool = adaptive_cmd_wait
+        self._cmd_wait_by_command: dict[str, float] = {}
+        self._cmd_wait_floor_by_command: dict[str, float] = {}
+        self._last_command_time: float = 0
+        self._poll_cycle_duration: float | None = None
+        self._optimistic_writes: bool = optimistic_writes
+        self._parallel_units: int | str = parallel_units
+        self._parallel_unit_nos: list[int] = list(range(parallel_units)) if isinstance(parallel_units, int) else []
+        self._stats: BusStats = BusStats()
+        self._command_retries: int = command_retries
+        self._command_retry_backoff: float = command_retry_backoff
+        self._breaker_failure_threshold: int = breaker_failure_threshold
+        self._breaker_reset_timeout: float = breaker_reset_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._first_byte_timeout: float | None = first_byte_timeout
+        self._inter_byte_timeout: float | None = inter_byte_timeout
+        self._dead_link_threshold: int = dead_link_threshold
+        self._silent_command_count: int = 0
+        self._last_silent_request: bytes | None = None
+        self._first_byte_delay_by_command: dict[str, float] = {}
+        self._cycle_budget: float | None = cycle_budget
+        self._default_cycle_budget: float | None = None
+        self._cycle_start_time: float = 0
+        self._deferred_command_names: set[str] = set()
+        self._previously_deferred_command_names: set[str] = set()
+        self._diagnostic_ports: bool = diagnostic_ports
+        self._tracer: NullTracer = NULL_TRACER
+        self._write_coalescer: WriteCoalescer | None = None
+        if write_coalesce_window > 0:
+            self._write_coalescer = WriteCoalescer(self.set_properties, write_coalesce_window)
 
         super().__init__(**kwargs)
 
-        for cls in commands.get_command_classes(self._model):
+        if trace_buffer_size > 0:
+            self._tracer = Tracer(self.get_id(), trace_buffer_size)
+
+        # With an "auto" model, the model is detected by probing commands; it's then known as of `make_port_args()`
+        self._configured_model: str = self._model
+        self._probe_commands: bool = probe_commands or self._model == "auto"
+        self.set_command_classes(commands.get_command_classes(self._model))
+
+        # A replayed inverter needs to know its model upfront, as there's nothing to detect it from
+        if serial_port.startswith("replay:") and self._get_replay_model() not in RECORDINGS:
+            models = ", ".join(RECORDINGS)
+            raise MPPSolarException(f"Cannot replay model {self._get_replay_model()}, use replay:<model> with {models}")
+
+    def set_command_classes(self, cmd_classes: list[type[commands.Command]]) -> None:
+        self._command_classes = cmd_classes
+        self._setter_command_classes_by_property = {}
+        self._response_command_classes_by_property = {}
+        for cls in cmd_classes:
             for name in cls.get_request_property_definitions():
                 self._setter_command_classes_by_property.setdefault(name, []).append(cls)
+            for name, details in cls.get_response_property_definitions().items():
+                if not details["is_choices"]:
+                    self._response_command_classes_by_property.setdefault(name, []).append(cls)
+
+    def get_command_classes(self) -> list[type[commands.Command]]:
+        return self._command_classes
 
     def make_io(self) -> BaseIO:
-        if re.match(r".*hidraw\d+", self._serial_port):
+        if self._serial_port.startswith("replay:"):
+            return ReplayIO(self._get_replay_model(), baud=self._serial_baud)
+        elif re.match(r".*hidraw\d+", self._serial_port):
             return HIDRawIO(self._serial_port)
         else:
             return SerialIO(self._serial_port, self._serial_baud)
 
-    async def run_command(self, io: BaseIO, cls: type[commands.Command], **params) -> Properties:
-        params = dict(params, **self.prepare_command_params(cls))
+    def _get_replay_model(self) -> str:
+        return self._serial_port[7:] or self._configured_model
+
+    def get_io(self) -> BaseIO:
+        # The IO session is opened lazily and kept open across polls and writes; it's only reopened after a failure,
+        # with an exponential backoff, so that a missing device doesn't get hammered with open attempts
+        if self._io is None:
+            remaining = self._io_reopen_time - time.monotonic()
+            if remaining > 0:
+                raise MPPSolarIOUnavailable(f"Not reopening {self._serial_port} for another {remaining:.1f} seconds")
+
+            self.debug("opening %s", self._serial_port)
+            try:
+                self._io = self.make_io()
+            except Exception as e:
+                self._schedule_io_reopen()
+                raise MPPSolarIOUnavailable(f"Cannot open {self._serial_port}: {e}") from e
+
+            # Only used for tracing, but cheaper to find out once per IO session than on each read
+            self._io_read_mode = "polled" if self._io.fileno() is None else "event-driven"
+
+        return self._io
+
+    def close_io(self) -> None:
+        if self._io is None:
+            return
+
+        self.debug("closing %s", self._serial_port)
+        try:
+            self._io.close()
+        except Exception as e:
+            self.warning("failed to close %s: %s", self._serial_port, e)
+        finally:
+            self._io = None
+
+    def _schedule_io_reopen(self) -> None:
+        self._io_reopen_backoff = min(
+            max(self._io_reopen_backoff * 2, self.IO_REOPEN_BACKOFF_MIN), self.IO_REOPEN_BACKOFF_MAX
+        )
+        self._io_reopen_time = time.monotonic() + self._io_reopen_backoff
+
+    def _handle_io_failure(self, reason: str) -> None:
+        self.close_io()
+        self._schedule_io_reopen()
+        self.warning("IO session failed (%s), reopening in %s seconds", reason, self._io_reopen_backoff)
+
+    async def handle_disable(self) -> None:
+        await super().handle_disable()
+        self.close_io()
+
+    async def handle_cleanup(self) -> None:
+        await super().handle_cleanup()
+        if self._write_coalescer:
+            self._write_coalescer.cancel()
+        self.close_io()
+
+    async def run_command(
+        self, cls: type[commands.Command], *, priority: int = PRIORITY_POLL, probing: bool = False, **params
+    ) -> Properties:
+        # Commands run while `probing` are expected to go unanswered at times, so they don't count towards dead link
+        # detection
+        params = dict(self.prepare_command_params(cls), **params)
         if params:
             params_str = ", ".join(f"{k}={json_utils.dumps(v)}" for k, v in params.items())
             self.debug("running command %s(%s)", cls.get_name(), params_str)
@@ -87,50 +264,741 @@ class SerialMPPSolarInverter(MPPSolarInverter):
         if not cmd.REQUEST_FMT:
             return {}
 
+        with self._tracer.span(cls.get_name(), priority=PRIORITY_NAMES.get(priority)):
+            return await self._run_command(cmd, priority, probing)
+
+    async def _run_command(self, cmd: commands.Command, priority: int, probing: bool) -> Properties:
+        cls = type(cmd)
+        response, actual_wait = await self._exchange(cmd, priority, probing)
+        command_stats = self._stats.get_command_stats(cls.get_name())
+        try:
+            with self._tracer.span("parse"):
+                parsed_response = cmd.parse_response(response)
+        except ResponseError as e:
+            if isinstance(e, CRCError):
+                command_stats.crc_errors += 1
+            elif isinstance(e, NAKError):
+                command_stats.naks += 1
+            else:
+                command_stats.other_errors += 1
+            self._adapt_cmd_wait(cls, actual_wait, success=False)
+            raise
+
+        self._adapt_cmd_wait(cls, actual_wait, success=True)
+
+        return parsed_response
+
+    async def _exchange(self, cmd: commands.Command, priority: int, probing: bool) -> tuple[bytes, float]:
+        # Sends the request of `cmd` and returns the complete response, along with the wait before sending it
+        cls = type(cmd)
+        tracer = self._tracer
         request = cmd.prepare_request()
-        async with self._command_lock:
-            self.debug('sending "%s"', repr(request)[2:-1])
-            io.write(request)
-            response = await io.read(self.TIMEOUT)
-            await asyncio.sleep(self.CMD_WAIT)
+        command_stats = self._stats.get_command_stats(cls.get_name())
+        acquire_start_time = time.perf_counter_ns() if tracer.enabled else 0
+        async with self._scheduler.acquire(priority):
+            if tracer.enabled:
+                tracer.add("acquire", acquire_start_time, time.perf_counter_ns())
+
+            # Commands are spaced out only before sending the next one, so that no time is wasted after the last
+            # command of a cycle
+            cmd_wait = self.get_cmd_wait(cls)
+            remaining_wait = self._last_command_time + cmd_wait - time.monotonic()
+            if remaining_wait > 0:
+                with tracer.span("wait"):
+                    await asyncio.sleep(remaining_wait)
+            actual_wait = time.monotonic() - self._last_command_time
+
+            io = self.get_io()
+            try:
+                # Bytes left over from a previous (e.g. timed out) command would otherwise prefix our response
+                while stale := io.read_available():
+                    self.debug('discarding "%s"', repr(stale)[2:-1])
+
+                self.debug('sending "%s"', repr(request)[2:-1])
+                command_stats.requests += 1
+                command_stats.bytes_sent += len(request)
+                start_time = time.monotonic()
+                with tracer.span("write"):
+                    io.write(request)
+                read_start_time = time.perf_counter_ns() if tracer.enabled else 0
+                try:
+                    response = await io.read(
+                        self.TIMEOUT, self.get_first_byte_timeout(cls, len(request)), self.get_inter_byte_timeout()
+                    )
+                finally:
+                    if tracer.enabled:
+                        tracer.add("read", read_start_time, time.perf_counter_ns(), mode=self._io_read_mode)
+            except OSError as e:
+                # Not the command's fault, so it's kept away from circuit breakers
+                command_stats.other_errors += 1
+                self._handle_io_failure(str(e))
+                raise MPPSolarIOUnavailable(f"IO error on {self._serial_port}: {e}") from e
+            finally:
+                self._last_command_time = time.monotonic()
+
             self.debug('received "%s"', repr(response)[2:-1])
+            command_stats.bytes_received += len(response)
+            first_byte_delay = io.get_first_byte_delay()
+            if first_byte_delay is not None:
+                command_stats.first_byte_delay.add(first_byte_delay)
+                self._update_first_byte_delay(cls, first_byte_delay)
+                if tracer.enabled:
+                    tracer.add("first byte", read_start_time, read_start_time + int(first_byte_delay * 1e9))
 
-        parsed_response = cmd.parse_response(response)
+            if not response.endswith(b"\r"):
+                command_stats.timeouts += 1
+                self._adapt_cmd_wait(cls, actual_wait, success=False)
 
-        return parsed_response
+                # A timeout alone may be the command's fault, but several commands in a row without a single byte
+                # of response mean that the link is dead; retries of an ignored command don't count again
+                if response:
+                    self._silent_command_count = 0
+                    self._last_silent_request = None
+                elif not probing and request != self._last_silent_request:
+                    self._silent_command_count += 1
+                    self._last_silent_request = request
+                if self._dead_link_threshold and self._silent_command_count >= self._dead_link_threshold:
+                    self._silent_command_count = 0
+                    self._last_silent_request = None
+                    self._handle_io_failure(f"no response to {self._dead_link_threshold} commands in a row")
+                    raise MPPSolarLinkDown(f"No response from {self._serial_port}")
+
+                raise MPPSolarTimeout(f"Timeout waiting for {cls.get_name()} response")
+
+            self._silent_command_count = 0
+            self._last_silent_request = None
+            self._io_reopen_backoff = 0
+            command_stats.latency.add(self._last_command_time - start_time)
+
+        return response, actual_wait
+
+    def get_first_byte_timeout(self, cls: type[commands.Command], request_size: int) -> float:
+        if self._first_byte_timeout is not None:
+            return self._first_byte_timeout
+
+        # The request is sent at 10 bits per byte, after which the inverter needs some time to process it; commands
+        # that were recently seen to take longer than that are given a multiple of their average first byte delay, up
+        # to a limit, so that a single slow response doesn't delay dead link detection for good
+        timeout = request_size * 10 / self._serial_baud + self.FIRST_BYTE_PROCESSING_TIME
+        first_byte_delay = self._first_byte_delay_by_command.get(cls.get_name(), 0)
+        adapted_timeout = min(first_byte_delay * self.FIRST_BYTE_DELAY_FACTOR, self.FIRST_BYTE_TIMEOUT_MAX)
+
+        return max(timeout, adapted_timeout)
+
+    def _update_first_byte_delay(self, cls: type[commands.Command], first_byte_delay: float) -> None:
+        name = cls.get_name()
+        average = self._first_byte_delay_by_command.get(name)
+        if average is not None:
+            first_byte_delay = average + (first_byte_delay - average) * self.FIRST_BYTE_DELAY_SMOOTHING
+        self._first_byte_delay_by_command[name] = first_byte_delay
+
+    def get_inter_byte_timeout(self) -> float:
+        if self._inter_byte_timeout is not None:
+            return self._inter_byte_timeout
+
+        return max(self.INTER_BYTE_TIMEOUT_MIN, 20 * 10 / self._serial_baud)
+
+    def get_cmd_wait(self, cls: type[commands.Command]) -> float:
+        if not self._adaptive_cmd_wait:
+            return self.CMD_WAIT
+
+        return self._cmd_wait_by_command.get(cls.get_name(), self.CMD_WAIT)
+
+    def _adapt_cmd_wait(self, cls: type[commands.Command], actual_wait: float, success: bool) -> None:
+        if not self._adaptive_cmd_wait:
+            return
+
+        name = cls.get_name()
+        cmd_wait = self._cmd_wait_by_command.get(name, self.CMD_WAIT)
+        if success:
+            # Only a response that came after (roughly) the currently learned wait tells us anything about it
+            if actual_wait > cmd_wait * self.CMD_WAIT_INCREASE_FACTOR:
+                return
+
+            floor = self._cmd_wait_floor_by_command.get(name, self.CMD_WAIT_MIN)
+            cmd_wait = max(cmd_wait * self.CMD_WAIT_DECREASE_FACTOR, floor)
+        else:
+            if actual_wait >= self.CMD_WAIT:
+                return  # failure has nothing to do with command spacing
+
+            # Never go as low as the wait that we've just seen failing
+            floor = min(actual_wait * self.CMD_WAIT_INCREASE_FACTOR, self.CMD_WAIT)
+            self._cmd_wait_floor_by_command[name] = max(self._cmd_wait_floor_by_command.get(name, 0), floor)
+            cmd_wait = min(max(cmd_wait * self.CMD_WAIT_INCREASE_FACTOR, floor), self.CMD_WAIT)
+
+        if cmd_wait != self._cmd_wait_by_command.get(name):
+            self.debug("adjusting wait before command %s to %.3f seconds", name, cmd_wait)
+            self._cmd_wait_by_command[name] = cmd_wait
 
     def prepare_command_params(self, cmd: type[commands.Command]) -> Properties:
         return cmd.REQUEST_DEFAULT_VALUES
 
+    def get_command_poll_interval(self, cls: type[commands.Command]) -> int | None:
+        return self._command_poll_intervals.get(cls.get_name(), cls.POLL_INTERVAL)
+
+    def is_command_poll_due(self, cls: type[commands.Command]) -> bool:
+        last_poll_time = self._last_poll_time_by_command.get(cls.get_name())
+        if last_poll_time is None:
+            return True
+
+        poll_interval = self.get_command_poll_interval(cls)
+        if poll_interval is None:
+            return False
+
+        return time.monotonic() - last_poll_time >= poll_interval
+
+    async def poll_command(self, cls: type[commands.Command], priority: int = PRIORITY_POLL) -> None:
+        self.update_properties(await self.run_command(cls, priority=priority))
+        self._last_poll_time_by_command[cls.get_name()] = time.monotonic()
+
+    def get_breaker(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(self._breaker_failure_threshold, self._breaker_reset_timeout)
+
+        return breaker
+
+    async def poll_with_breaker(self, key: str, func: Callable[[], Awaitable[None]]) -> None:
+        # Retries `func` on CRC errors and timeouts, with a jittered exponential backoff, and keeps track of failures in
+        # the circuit breaker of `key`; raises `CircuitOpenError` without calling `func` while the breaker is open
+        breaker = self.get_breaker(key)
+        if not breaker.allow(time.monotonic()):
+            raise CircuitOpenError(f"Circuit breaker of {key} is open")
+
+        attempts = 1 if breaker.state == STATE_HALF_OPEN else self._command_retries + 1
+        for attempt in range(attempts):
+            try:
+                await func()
+            except (CRCError, MPPSolarTimeout) as e:
+                if attempt + 1 >= attempts:
+                    breaker.record_failure(time.monotonic())
+                    raise
+
+                # After a timeout, the IO session can't be reopened before its backoff ends
+                delay = random.uniform(0, self._command_retry_backoff * 2**attempt)
+                delay = max(delay, self._io_reopen_time - time.monotonic())
+                self.debug("retrying %s in %.2f seconds: %s", key, delay, e)
+                await asyncio.sleep(delay)
+            except MPPSolarLinkDown:
+                # The command's own silence is what took the link down, unlike other IO failures
+                breaker.record_failure(time.monotonic())
+                raise
+            except MPPSolarIOUnavailable:
+                raise  # not the command's fault
+            except Exception:
+                breaker.record_failure(time.monotonic())
+                raise
+            else:
+                breaker.record_success()
+                return
+
+    def get_parallel_params(self, cls: type[commands.Command]) -> list[Properties]:
+        # Setters addressing a parallel system unit are sent to each of the units
+        if "_parallel_no" not in cls.REQUEST_DEFAULT_VALUES or not self._parallel_unit_nos:
+            return [{}]
+
+        return [{"_parallel_no": no} for no in self._parallel_unit_nos]
+
+    async def poll_parallel_unit(self, no: int, priority: int = PRIORITY_POLL) -> None:
+        cls = commands.get_parallel_status_command_class(self._model)
+        response = await self.run_command(cls, priority=priority, _parallel_no=no)
+        self.update_properties({f"parallel{no}_{name}": value for name, value in response.items()})
+
+    async def read_parallel_units(self) -> None:
+        cls = commands.get_parallel_status_command_class(self._model)
+        if not cls or not self._parallel_unit_nos or not self.is_command_poll_due(cls):
+            return
+        if self._defer_command(cls, len(self._parallel_unit_nos) * self.estimate_command_duration(cls)):
+            return
+
+        # All units are polled within the same cycle, so that totals are computed from values read together
+        fresh_nos = set()
+        for no in self._parallel_unit_nos:
+            try:
+                await self.poll_with_breaker(f"{cls.get_name()}{no}", functools.partial(self.poll_parallel_unit, no))
+                fresh_nos.add(no)
+            except CircuitOpenError:
+                self.debug("skipping command %s%s", cls.get_name(), no)
+            except MPPSolarIOUnavailable:
+                raise
+            except Exception as e:
+                self.error("command %s%s failed: %s", cls.get_name(), no, e)
+                for name in cls.get_response_property_definitions():
+                    self._properties.pop(f"parallel{no}_{name}", None)
+
+        self._last_poll_time_by_command[cls.get_name()] = time.monotonic()
+
+        # A total that leaves out a unit (e.g. skipped by its circuit breaker) would look like a drop, so it's rather
+        # unknown until all units are read again
+        for name in self.PARALLEL_TOTAL_PROPERTIES:
+            values = [self._properties.get(f"parallel{no}_{name}") for no in self._parallel_unit_nos]
+            if len(fresh_nos) == len(self._parallel_unit_nos) and None not in values:
+                self.update_properties({f"parallel_total_{name}": sum(values)})
+            else:
+                self._properties.pop(f"parallel_total_{name}", None)
+
+    async def detect_parallel_units(self) -> None:
+        # Probes units 0 to the maximum number of parallel units reported by the inverter, keeping those present; units
+        # that don't answer at all are as good as absent
+        cls = commands.get_parallel_status_command_class(self._model)
+        if not cls:
+            self._parallel_unit_nos = []
+            return
+
+        parallel_max = 0
+        for settings_cls in self._command_classes:
+            if "{_parallel_max:" in settings_cls.RESPONSE_FMT:
+                try:
+                    parallel_max = (await self.run_command(settings_cls)).get("_parallel_max", 0)
+                except (ResponseError, MPPSolarTimeout) as e:
+                    self.warning("cannot read maximum number of parallel units, probing unit 0 only: %s", e)
+                break
+
+        parallel_unit_nos = []
+        for no in range(parallel_max + 1):
+            try:
+                response = await self.run_command(cls, probing=True, _parallel_no=no)
+            except (ResponseError, MPPSolarTimeout):
+                continue
+            if response.get("_is_present"):
+                parallel_unit_nos.append(no)
+
+        self._parallel_unit_nos = parallel_unit_nos
+        self.debug("detected parallel units: %s", ", ".join(str(no) for no in self._parallel_unit_nos) or "none")
+
+    async def probe_firmware_version(self) -> str | None:
+        try:
+            return (await self.run_command(QVFW))["firmware_version"]
+        except (ResponseError, MPPSolarTimeout):
+            return None  # not answered by all models, some of which ignore it altogether
+
+    async def _probe_request(self, classes: list[type[commands.Command]]) -> list[Properties | None]:
+        # Sends the request shared by (model specific variants of) a command once and parses the response with each of
+        # `classes`, giving `None` for those that don't support it, i.e. whose response is a rejection or in an
+        # unexpected format; a CRC error is given a second chance. Timeouts are raised, since a slow or asleep inverter
+        # says nothing about the command.
+        cmds = [cls(**self.prepare_command_params(cls)) for cls in classes]
+        name = classes[0].get_name()
+        self.debug("probing command %s", name)
+        for _ in range(2):
+            with self._tracer.span(name, priority=PRIORITY_NAMES.get(PRIORITY_POLL)):
+                response, _ = await self._exchange(cmds[0], PRIORITY_POLL, probing=False)
+
+            parsed_responses = []
+            for cmd in cmds:
+                try:
+                    parsed_responses.append(cmd.parse_response(response))
+                except CRCError:
+                    self._stats.get_command_stats(name).crc_errors += 1
+                    break  # the CRC covers the whole response, whatever the variant
+                except ResponseError:
+                    parsed_responses.append(None)
+            else:
+                return parsed_responses
+
+        return [None] * len(classes)
+
+    async def probe_commands(self) -> dict[type[commands.Command], Properties | None]:
+        # Runs each candidate query command once and keeps the model whose command response formats best match the
+        # inverter, dropping the commands it doesn't support; returns the probed responses
+        if self._configured_model == "auto":
+            models = list(commands.COMMANDS_BY_MODEL)
+        else:
+            models = [self._configured_model]
+
+        # Model specific variants of a command share its request, which is sent only once
+        classes_by_request = {}
+        for model in models:
+            for cls in commands.get_command_classes(model):
+                if cls.get_response_property_definitions():
+                    request = cls(**self.prepare_command_params(cls)).prepare_request()
+                    classes = classes_by_request.setdefault(request, [])
+                    if cls not in classes:
+                        classes.append(cls)
+
+        # Commands that aren't answered are kept; an unavailable IO (e.g. a dead link) is raised, as probing can only
+        # be done again later
+        responses_by_class = {}
+        unanswered_classes = set()
+        for classes in classes_by_request.values():
+            try:
+                responses_by_class.update(zip(classes, await self._probe_request(classes)))
+            except MPPSolarTimeout as e:
+                self.warning("probing command %s failed: %s", classes[0].get_name(), e)
+                unanswered_classes.update(classes)
+
+        if self._configured_model == "auto" and not responses_by_class:
+            raise MPPSolarException("Cannot detect the model, no probed command was answered")
+
+        best_score = None
+        for model in models:
+            query_classes = [cls for cls in commands.get_command_classes(model) if cls in responses_by_class]
+            supported_count = sum(1 for cls in query_classes if responses_by_class[cls] is not None)
+            property_count = sum(len(responses_by_class[cls] or {}) for cls in query_classes)
+            score = (2 * supported_count - len(query_classes), property_count)
+            if best_score is None or score > best_score:
+                best_score = score
+                self._model = model
+
+        # Setters are dropped along with the query commands that report their properties, unless these are also
+        # reported by a supported command; setters of properties that are never reported are kept, as they may be used
+        # internally (e.g. to force battery charging)
+        cmd_classes = commands.get_command_classes(self._model)
+        supported_names = set()
+        unsupported_names = set()
+        for cls in cmd_classes:
+            if cls in responses_by_class:
+                names = supported_names if responses_by_class[cls] is not None else unsupported_names
+                names.update(cls.get_response_property_definitions())
+
+        pruned_classes = []
+        for cls in cmd_classes:
+            if cls in responses_by_class:
+                if responses_by_class[cls] is None:
+                    continue
+            else:
+                names = set(cls.get_request_property_definitions())
+                if names & unsupported_names and not names & supported_names:
+                    continue
+            pruned_classes.append(cls)
+
+        self.set_command_classes(pruned_classes)
+        dropped_names = [cls.get_name() for cls in cmd_classes if cls not in pruned_classes]
+        self.info("using model %s, without unsupported commands: %s", self._model, ", ".join(dropped_names) or "none")
+        unanswered_names = [cls.get_name() for cls in cmd_classes if cls in unanswered_classes]
+        if unanswered_names:
+            self.warning("keeping unanswered commands: %s", ", ".join(unanswered_names))
+
+        return responses_by_class
+
+    async def probe_capabilities(self) -> None:
+        probed_responses = await self.probe_commands() if self._probe_commands else {}
+
+        # Several properties may take their choices from the same command, which is then run only once (or not at all,
+        # if it was just probed)
+        choices_by_property = {}
+        for cls in self._command_classes:
+            response_property_definitions = cls.get_response_property_definitions()
+            names = [name for name, details in response_property_definitions.items() if details["is_choices"]]
+            if not names:
+                continue
+
+            response = probed_responses.get(cls) or await self.run_command(cls)
+            for name in names:
+                choices_by_property[name] = [{"value": c, "label": str(c)} for c in response[name]]
+
+        self._choices_by_property = choices_by_property
+
+        if self._parallel_units == "auto":
+            await self.detect_parallel_units()
+
+    def get_firmware_version(self) -> str | None:
+        return self._firmware_version
+
+    def _get_capabilities(self) -> dict[str, Any]:
+        return {
+            "serial_port": self._serial_port,
+            "model": self._configured_model,
+            "firmware_version": self._firmware_version,
+            "choices": self._choices_by_property,
+            "parallel_units": self._parallel_unit_nos if self._parallel_units == "auto" else None,
+            "command_plan": {
+                "model": self._model,
+                "commands": [cls.__name__ for cls in self._command_classes],
+            }
+            if self._probe_commands
+            else None,
+        }
+
+    def _get_capabilities_persist_name(self) -> str:
+        return f"mppsolar_capabilities_{self.get_id()}"
+
+    async def load_capabilities(self) -> bool:
+        try:
+            capabilities = await persist.get_value(self._get_capabilities_persist_name())
+        except Exception as e:
+            self.error("failed to load cached capabilities: %s", e, exc_info=True)
+            return False
+
+        # Capabilities cached for another device or model don't apply
+        if not capabilities:
+            return False
+        if capabilities["serial_port"] != self._serial_port or capabilities["model"] != self._configured_model:
+            return False
+        if self._parallel_units == "auto" and capabilities["parallel_units"] is None:
+            return False
+
+        command_plan = capabilities.get("command_plan")
+        if self._probe_commands:
+            if not command_plan:
+                return False
+
+            # Commands that no longer exist invalidate the plan
+            classes_by_name = {cls.__name__: cls for cls in commands.get_command_classes(command_plan["model"])}
+            if not all(name in classes_by_name for name in command_plan["commands"]):
+                return False
+
+            self._model = command_plan["model"]
+            self.set_command_classes([classes_by_name[name] for name in command_plan["commands"]])
+
+        self._firmware_version = capabilities["firmware_version"]
+        self._choices_by_property = capabilities["choices"]
+        if self._parallel_units == "auto":
+            self._parallel_unit_nos = capabilities["parallel_units"]
+
+        self.debug("using cached capabilities of firmware %s", self._firmware_version)
+        return True
+
+    async def save_capabilities(self) -> bool:
+        try:
+            await persist.set_value(self._get_capabilities_persist_name(), self._get_capabilities())
+        except Exception as e:
+            self.error("failed to save capabilities: %s", e, exc_info=True)
+            return False
+
+        return True
+
+    async def refresh_capabilities(self) -> bool:
+        # Checks capabilities loaded from cache (or not probed yet) against the inverter; they are probed again only if
+        # the firmware version changed or is unknown. Returns `True` if they changed. They are checked again on the next
+        # poll until they are probed and saved successfully.
+        if not self._capabilities_stale:
+            return False
+
+        old_capabilities = self._get_capabilities()
+        try:
+            firmware_version = await self.probe_firmware_version()
+            if firmware_version is not None and firmware_version == self._firmware_version:
+                self._capabilities_stale = False
+                return False
+
+            await self.probe_capabilities()
+        except Exception as e:
+            self.warning("failed to refresh capabilities: %s", e)
+            return self._get_capabilities() != old_capabilities
+
+        # The cached firmware version is what tells that probed capabilities are up to date, so it's kept only along
+        # with them
+        old_firmware_version = self._firmware_version
+        self._firmware_version = firmware_version
+        if not self._cache_capabilities or await self.save_capabilities():
+            self._capabilities_stale = False
+        else:
+            self._firmware_version = old_firmware_version
+
+        return self._get_capabilities() != old_capabilities
+
+    def get_scheduler_stats(self) -> dict[str, Any]:
+        return self._scheduler.get_stats()
+
+    def get_stats(self) -> dict[str, Any]:
+        return dict(
+            self._stats.to_json(),
+            scheduler=self._scheduler.get_stats(),
+            breakers={key: breaker.to_json() for key, breaker in sorted(self._breakers.items())},
+        )
+
+    def get_tracer(self) -> NullTracer:
+        return self._tracer
+
+    def dump_trace(self, path: str) -> None:
+        # Writes recorded spans as Chrome trace JSON; see `trace_buffer_size`
+        if not isinstance(self._tracer, Tracer):
+            raise MPPSolarException("Tracing is not enabled")
+
+        dump_chrome_trace([self._tracer], path)
+
+    def _get_diagnostic_command_classes(self) -> list[type[commands.Command]]:
+        cmd_classes = [cls for cls in self._command_classes if cls.has_response_properties()]
+        parallel_cls = commands.get_parallel_status_command_class(self._model)
+        if parallel_cls and self._parallel_unit_nos:
+            cmd_classes.append(parallel_cls)
+
+        return cmd_classes
+
+    def _update_diagnostic_properties(self) -> None:
+        values = {"diag_poll_cycle_duration": self._poll_cycle_duration}
+        for cls in self._get_diagnostic_command_classes():
+            command_stats = self._stats.get_command_stats(cls.get_name())
+            mean_latency = command_stats.latency.get_mean()
+            prefix = f"diag_{cls.get_name().lower()}"
+            values[f"{prefix}_latency"] = mean_latency * 1000 if mean_latency is not None else None
+            values[f"{prefix}_errors"] = command_stats.get_errors()
+            values[f"{prefix}_breaker"] = self._get_breaker_state(cls)
+        self.update_properties(values)
+
+    def _get_breaker_state(self, cls: type[commands.Command]) -> str:
+        # The breakers of parallel system units are summed up as the worst of them
+        if cls is commands.get_parallel_status_command_class(self._model):
+            keys = [f"{cls.get_name()}{no}" for no in self._parallel_unit_nos]
+        else:
+            keys = [cls.get_name()]
+
+        states = [self._breakers[key].state for key in keys if key in self._breakers]
+        return max(states, key=STATES.index, default=STATE_CLOSED)
+
+    async def poll(self) -> None:
+        # Capabilities loaded from cache are checked against the inverter in the background, once ports exist
+        if await self.refresh_capabilities():
+            await self.update_ports()
+
+        await super().poll()
+
+    def set_default_cycle_budget(self, budget: float | None) -> None:
+        # Used when no cycle budget is configured, instead of the poll interval, which isn't set on inverters that are
+        # polled by someone else (e.g. a fleet)
+        self._default_cycle_budget = budget
+
+    def get_cycle_budget(self) -> float:
+        # Defaults to the poll interval, so that polls keep their cadence
+        if self._cycle_budget is not None:
+            return self._cycle_budget
+        if self._default_cycle_budget is not None:
+            return self._default_cycle_budget
+
+        return self.get_poll_interval()
+
+    def estimate_command_duration(self, cls: type[commands.Command]) -> float:
+        mean_latency = self._stats.get_command_stats(cls.get_name()).latency.get_mean()
+        return (mean_latency or 0) + self.get_cmd_wait(cls)
+
+    def _defer_command(self, cls: type[commands.Command], estimated_duration: float) -> bool:
+        # Defers a command to the next cycle if it isn't expected to fit in what's left of the cycle budget; commands
+        # of rank 0 are never deferred and neither are those deferred by the previous cycle, so that they don't starve
+        budget = self.get_cycle_budget()
+        name = cls.get_name()
+        if not budget or cls.POLL_RANK == 0 or name in self._previously_deferred_command_names:
+            return False
+
+        elapsed = time.monotonic() - self._cycle_start_time
+        if elapsed + estimated_duration <= budget:
+            return False
+
+        self.debug("deferring command %s to the next cycle", name)
+        self._deferred_command_names.add(name)
+        self._stats.get_command_stats(name).deferrals += 1
+        return True
+
     async def read_properties(self) -> None:
-        with contextlib.closing(self.make_io()) as io:
-            for cls in commands.get_command_classes(self._model):
-                if cls.has_response_properties():
+        start_time = self._cycle_start_time = time.monotonic()
+        self._previously_deferred_command_names = self._deferred_command_names
+        self._deferred_command_names = set()
+
+        # Commands deferred by the previous cycle go first among those of the same rank
+        cmd_classes = sorted(
+            self._command_classes,
+            key=lambda c: (c.POLL_RANK, c.get_name() not in self._previously_deferred_command_names),
+        )
+        with self._tracer.span("poll cycle"):
+            for cls in cmd_classes:
+                if cls.has_response_properties() and self.is_command_poll_due(cls):
+                    if self._defer_command(cls, self.estimate_command_duration(cls)):
+                        continue
                     try:
-                        self._properties.update(await self.run_command(io, cls))
+                        await self.poll_with_breaker(cls.get_name(), functools.partial(self.poll_command, cls))
+                    except CircuitOpenError:
+                        self.debug("skipping command %s", cls.get_name())
+                    except MPPSolarIOUnavailable:
+                        raise  # no use trying the rest of the cycle
                     except Exception as e:
                         self.error("command %s failed: %s", cls.get_name(), e)
-                        continue
+
+            await self.read_parallel_units()
+
+        self._poll_cycle_duration = time.monotonic() - start_time
+        self._stats.poll_cycle_duration.add(self._poll_cycle_duration)
+        self.debug("poll cycle took %.3f seconds", self._poll_cycle_duration)
+        budget = self.get_cycle_budget()
+        if budget and self._poll_cycle_duration > budget:
+            self._stats.poll_cycle_overruns += 1
+
+        if self._diagnostic_ports:
+            self._update_diagnostic_properties()
+
+    def get_poll_cycle_duration(self) -> float | None:
+        return self._poll_cycle_duration
 
     async def set_property(self, name: str, value: Property) -> None:
-        cmd_classes = self._setter_command_classes_by_property[name]
-        params = {name: value}
-        old_value = self._properties.get(name)
+        if self._write_coalescer:
+            await self._write_coalescer.write(name, value)
+        else:
+            await self.set_properties({name: value})
 
-        if old_value == value:
+    async def set_properties(self, values: Properties) -> None:
+        old_values = {name: self._properties.get(name) for name in values}
+        values = {name: value for name, value in values.items() if value != old_values[name]}
+        if not values:
             return
 
-        self.debug('setting property "%s" from %s to %s', name, json_utils.dumps(old_value), json_utils.dumps(value))
+        for name, value in values.items():
+            self.debug(
+                'setting property "%s" from %s to %s', name, json_utils.dumps(old_values[name]), json_utils.dumps(value)
+            )
 
-        with contextlib.closing(self.make_io()) as io:
-            for cls in cmd_classes:
-                await self.run_command(io, cls, **params)
+        # Run setter commands in the order given by the model command list
+        setter_commands = []
+        for name, value in values.items():
+            for cls in self._setter_command_classes_by_property[name]:
+                setter_commands.append((cls, name, value))
+        cmd_classes = self._command_classes
+        setter_commands.sort(key=lambda c: cmd_classes.index(c[0]))
 
-            await self._handle_post_set_property(io, name, old_value, value)
+        # Optimistically show new values right away; they're rolled back if rejected and corrected by the read-back
+        if self._optimistic_writes:
+            self._properties.update(values)
 
-    async def _handle_post_set_property(
-        self, io: BaseIO, name: str, old_value: Property | None, new_value: Property
-    ) -> None:
+        errors = {}
+        # Keep the bus for the whole write, so that no queued poll command gets in between the write and the read-back
+        async with self._scheduler.acquire(PRIORITY_WRITE):
+            for cls, name, value in setter_commands:
+                if name in errors:
+                    continue
+                try:
+                    for params in self.get_parallel_params(cls):
+                        await self.run_command(cls, priority=PRIORITY_WRITE, **params, **{name: value})
+                except Exception as e:
+                    self.error('failed to set property "%s": %s', name, e)
+                    errors[name] = e
+
+            for name in errors:
+                if old_values[name] is None:
+                    self._properties.pop(name, None)
+                else:
+                    self._properties[name] = old_values[name]
+            values = {name: value for name, value in values.items() if name not in errors}
+
+            # Only read back the settings commands owning the written properties, each of them only once
+            readback_cmd_classes = []
+            for name in values:
+                for cls in self._response_command_classes_by_property.get(name, []):
+                    if cls not in readback_cmd_classes:
+                        readback_cmd_classes.append(cls)
+            for cls in readback_cmd_classes:
+                try:
+                    await self.poll_command(cls, PRIORITY_READBACK)
+                except Exception as e:
+                    # Have the next poll cycle confirm or correct the written values instead
+                    self.error("command %s failed: %s", cls.get_name(), e)
+                    self._last_poll_time_by_command.pop(cls.get_name(), None)
+
+        for name, value in values.items():
+            read_value = self._properties.get(name)
+            if name in self._response_command_classes_by_property and read_value != value:
+                self.warning(
+                    'property "%s" read back as %s instead of %s',
+                    name,
+                    json_utils.dumps(read_value),
+                    json_utils.dumps(value),
+                )
+
+        for name, value in values.items():
+            with self._tracer.span("post set property", property=name):
+                await self._handle_post_set_property(name, old_values[name], value)
+
+        if errors:
+            raise next(iter(errors.values()))
+
+    async def _handle_post_set_property(self, name: str, old_value: Property | None, new_value: Property) -> None:
         # When changing output source priority, the user normally expects the inverter to switch to battery
         # charging/discharging mode right away, depending on the new setting. The inverter doesn't do this automatically
         # as it attempts to preserve the current charging/discharging battery phase, so we need to force it by
@@ -146,7 +1014,7 @@ class SerialMPPSolarInverter(MPPSolarInverter):
                 and soc >= self._force_battery_discharge_min_soc
             ):
                 self.info("forcing battery discharge")
-                await self._force_battery_discharge(io)
+                await self._force_battery_discharge()
             elif (
                 old_value == constants.OUTPUT_SOURCE_PRIORITY_SBG
                 and mode == constants.MODE_BATTERY
@@ -154,9 +1022,9 @@ class SerialMPPSolarInverter(MPPSolarInverter):
                 and grid_voltage > self._force_battery_charge_min_grid_voltage
             ):
                 self.info("forcing battery charge")
-                await self._force_battery_charge(io)
+                await self._force_battery_charge()
 
-    async def _force_battery_discharge(self, io: BaseIO) -> None:
+    async def _force_battery_discharge(self) -> None:
         cmd_classes = self._setter_command_classes_by_property.get("battery_back_to_discharging_voltage", [])
         if not cmd_classes:
             self.warning("cannot force battery mode: command not available")
@@ -182,12 +1050,14 @@ class SerialMPPSolarInverter(MPPSolarInverter):
             return
 
         try:
-            await self.run_command(io, cls, battery_back_to_discharging_voltage=temp_value)
+            await self.run_command(cls, priority=PRIORITY_WRITE, battery_back_to_discharging_voltage=temp_value)
             await asyncio.sleep(self.BATTERY_FORCE_WAIT)
         finally:
-            await self.run_command(io, cls, battery_back_to_discharging_voltage=battery_back_to_discharging_voltage)
+            await self.run_command(
+                cls, priority=PRIORITY_WRITE, battery_back_to_discharging_voltage=battery_back_to_discharging_voltage
+            )
 
-    async def _force_battery_charge(self, io: BaseIO) -> None:
+    async def _force_battery_charge(self) -> None:
         cmd_classes = self._setter_command_classes_by_property.get("battery_back_to_charging_voltage", [])
         if not cmd_classes:
             self.warning("cannot force battery mode: command not available")
@@ -213,25 +1083,34 @@ class SerialMPPSolarInverter(MPPSolarInverter):
             return
 
         try:
-            await self.run_command(io, cls, battery_back_to_charging_voltage=temp_value)
+            await self.run_command(cls, priority=PRIORITY_WRITE, battery_back_to_charging_voltage=temp_value)
             await asyncio.sleep(self.BATTERY_FORCE_WAIT)
         finally:
-            await self.run_command(io, cls, battery_back_to_charging_voltage=battery_back_to_charging_voltage)
+            await self.run_command(
+                cls, priority=PRIORITY_WRITE, battery_back_to_charging_voltage=battery_back_to_charging_voltage
+            )
 
     async def make_port_args(self) -> list[dict[str, Any]]:
-        # All available command classes for this inverter model
-        cmd_classes = commands.get_command_classes(self._model)
-
-        # Fetch property choices
-        with contextlib.closing(self.make_io()) as io:
-            for cls in cmd_classes:
-                response_property_definitions = cls.get_response_property_definitions()
-                for name, details in response_property_definitions.items():
-                    if not details["is_choices"]:
-                        continue
+        # Use cached capabilities, if any, so that startup doesn't wait for the inverter
+        if not self._capabilities_known:
+            if self._cache_capabilities and await self.load_capabilities():
+                self._capabilities_stale = True
+            else:
+                try:
+                    self._firmware_version = await self.probe_firmware_version()
+                    await self.probe_capabilities()
+                except MPPSolarIOUnavailable as e:
+                    # Ports are made with what's known so far and updated once capabilities are probed, on a later poll
+                    self.warning("cannot probe capabilities, retrying later: %s", e)
+                    self._firmware_version = None
+                    self._capabilities_stale = True
+                else:
+                    if self._cache_capabilities:
+                        await self.save_capabilities()
+            self._capabilities_known = True
 
-                    response = await self.run_command(io, cls)
-                    self._choices_by_property[name] = [{"value": c, "label": str(c)} for c in response[name]]
+        # All available command classes for this inverter model
+        cmd_classes = self._command_classes
 
         # Create port args
         blacklisted_properties = self.BLACKLISTED_PROPERTIES | self._blacklist_properties
@@ -242,29 +1121,102 @@ class SerialMPPSolarInverter(MPPSolarInverter):
                 if (name in blacklisted_properties) or details["is_choices"]:
                     continue
 
-                type_ = details["type"]
-                port_args = {
-                    "property_name": name,
-                    "display_name": details["display_name"],
-                    "writable": name in self._setter_command_classes_by_property,
-                }
-                if type_ == "bool":
-                    port_args["driver"] = BooleanPort
-                elif type_ in ("int", "float"):
-                    port_args["driver"] = NumberPort
-                elif type_ == "str":
-                    port_args["driver"] = StringPort
-                else:
-                    continue
+                port_args = self._make_property_port_args(
+                    name, details, details["display_name"], name in self._setter_command_classes_by_property
+                )
+                if port_args:
+                    port_args_list.append(port_args)
 
-                if type_ in ("int", "str"):
-                    port_args.update(
-                        {
-                            "unit": details["unit"],
-                            "choices": details["choices"] or self._choices_by_property.get(name),
-                        }
-                    )
+        # Create parallel system unit port args
+        cls = commands.get_parallel_status_command_class(self._model)
+        if cls and self._parallel_unit_nos:
+            response_property_definitions = cls.get_response_property_definitions()
+            for no in self._parallel_unit_nos:
+                for name, details in response_property_definitions.items():
+                    if name in blacklisted_properties:
+                        continue
 
+                    display_name = f"Unit {no} {details['display_name'] or name}"
+                    port_args = self._make_property_port_args(f"parallel{no}_{name}", details, display_name, False)
+                    if port_args:
+                        port_args_list.append(port_args)
+
+            for name in self.PARALLEL_TOTAL_PROPERTIES:
+                details = response_property_definitions[name]
+                display_name = f"Total {details['display_name'] or name}"
+                port_args = self._make_property_port_args(f"parallel_total_{name}", details, display_name, False)
                 port_args_list.append(port_args)
 
+        if self._diagnostic_ports:
+            port_args_list += self._make_diagnostic_port_args()
+
+        port_args_list += self.make_energy_port_args(port_args_list)
+        port_args_list += self.make_aggregate_port_args(port_args_list)
+
+        return port_args_list
+
+    def _make_diagnostic_port_args(self) -> list[dict[str, Any]]:
+        port_args_list = [
+            {
+                "driver": NumberPort,
+                "property_name": "diag_poll_cycle_duration",
+                "display_name": "Poll Cycle Duration",
+                "writable": False,
+                "unit": "s",
+            }
+        ]
+        for cls in self._get_diagnostic_command_classes():
+            prefix = f"diag_{cls.get_name().lower()}"
+            port_args_list += [
+                {
+                    "driver": NumberPort,
+                    "property_name": f"{prefix}_latency",
+                    "display_name": f"{cls.get_name()} Mean Latency",
+                    "writable": False,
+                    "unit": "ms",
+                },
+                {
+                    "driver": NumberPort,
+                    "property_name": f"{prefix}_errors",
+                    "display_name": f"{cls.get_name()} Errors",
+                    "writable": False,
+                },
+                {
+                    "driver": StringPort,
+                    "property_name": f"{prefix}_breaker",
+                    "display_name": f"{cls.get_name()} Circuit Breaker",
+                    "writable": False,
+                    "choices": [{"value": state, "display_name": state.capitalize()} for state in STATES],
+                },
+            ]
+
         return port_args_list
+
+    def _make_property_port_args(
+        self, name: str, details: dict[str, Any], display_name: str | None, writable: bool
+    ) -> dict[str, Any] | None:
+        type_ = details["type"]
+        port_args = {
+            "property_name": name,
+            "display_name": display_name,
+            "writable": writable,
+        }
+        if type_ == "bool":
+            port_args["driver"] = BooleanPort
+        elif type_ in ("int", "float"):
+            port_args["driver"] = NumberPort
+            port_args.update(self.get_port_deadband_args(name))
+        elif type_ == "str":
+            port_args["driver"] = StringPort
+        else:
+            return None
+
+        if type_ in ("int", "str"):
+            port_args.update(
+                {
+                    "unit": details["unit"],
+                    "choices": details["choices"] or self._choices_by_property.get(name),
+                }
+            )
+
+        return port_args
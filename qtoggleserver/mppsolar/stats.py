@@ -0,0 +1,94 @@
+import bisect
+
+from typing import Any
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10)  # seconds
+POLL_CYCLE_BUCKETS = (0.5, 1, 2, 5, 10, 20, 60)  # seconds
+
+
+class Histogram:
+    # Counts values into buckets with the given upper bounds, plus one last bucket for anything above them
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self._bounds: tuple[float, ...] = bounds
+        self._counts: list[int] = [0] * (len(bounds) + 1)
+        self.count: int = 0
+        self.total: float = 0
+        self.max: float = 0
+        self.last: float | None = None
+
+    def add(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.last = value
+
+    def get_mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def to_json(self) -> dict[str, Any]:
+        buckets = {f"<={bound}": count for bound, count in zip(self._bounds, self._counts)}
+        buckets[f">{self._bounds[-1]}"] = self._counts[-1]
+
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.get_mean(),
+            "max": self.max,
+            "last": self.last,
+            "buckets": buckets,
+        }
+
+
+class CommandStats:
+    def __init__(self) -> None:
+        self.latency: Histogram = Histogram(LATENCY_BUCKETS)
+        self.first_byte_delay: Histogram = Histogram(LATENCY_BUCKETS)
+        self.requests: int = 0
+        self.bytes_sent: int = 0
+        self.bytes_received: int = 0
+        self.crc_errors: int = 0
+        self.naks: int = 0
+        self.timeouts: int = 0
+        self.other_errors: int = 0
+        self.deferrals: int = 0
+
+    def get_errors(self) -> int:
+        return self.crc_errors + self.naks + self.timeouts + self.other_errors
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "latency": self.latency.to_json(),
+            "first_byte_delay": self.first_byte_delay.to_json(),
+            "requests": self.requests,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "crc_errors": self.crc_errors,
+            "naks": self.naks,
+            "timeouts": self.timeouts,
+            "other_errors": self.other_errors,
+            "deferrals": self.deferrals,
+        }
+
+
+class BusStats:
+    def __init__(self) -> None:
+        self._command_stats: dict[str, CommandStats] = {}
+        self.poll_cycle_duration: Histogram = Histogram(POLL_CYCLE_BUCKETS)
+        self.poll_cycle_overruns: int = 0
+
+    def get_command_stats(self, name: str) -> CommandStats:
+        command_stats = self._command_stats.get(name)
+        if command_stats is None:
+            command_stats = self._command_stats[name] = CommandStats()
+
+        return command_stats
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "poll_cycle_duration": self.poll_cycle_duration.to_json(),
+            "poll_cycle_overruns": self.poll_cycle_overruns,
+            "commands": {name: stats.to_json() for name, stats in sorted(self._command_stats.items())},
+        }
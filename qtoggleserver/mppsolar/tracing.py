@@ -0,0 +1,104 @@
+import collections
+import itertools
+import json
+import os
+import time
+
+from typing import Any
+
+
+_track_ids = itertools.count(1)
+
+
+class _Span:
+    __slots__ = ("_args", "_name", "_start_time", "_tracer")
+
+    def __init__(self, tracer: "Tracer", name: str, args: dict[str, Any]) -> None:
+        self._tracer: Tracer = tracer
+        self._name: str = name
+        self._args: dict[str, Any] = args
+        self._start_time: int = 0
+
+    def __enter__(self) -> "_Span":
+        self._start_time = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._tracer.add(self._name, self._start_time, time.perf_counter_ns(), **self._args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+
+class NullTracer:
+    # Stands in for a tracer when tracing is disabled; spans cost a call and nothing else
+    _null_span = _NullSpan()
+
+    enabled = False
+
+    def span(self, name: str, **args) -> _NullSpan:
+        return self._null_span
+
+    def add(self, name: str, start_time: int, end_time: int, **args) -> None:
+        pass
+
+
+NULL_TRACER = NullTracer()
+
+
+class Tracer(NullTracer):
+    # Records timestamped spans into a bounded buffer, dropping the oldest ones when full; times are given in
+    # `time.perf_counter_ns()` nanoseconds
+
+    enabled = True
+
+    def __init__(self, track: str, max_spans: int) -> None:
+        self._track: str = track
+        self._track_id: int = next(_track_ids)
+        self._spans: collections.deque[tuple[str, int, int, dict[str, Any]]] = collections.deque(maxlen=max_spans)
+
+    def span(self, name: str, **args) -> _Span:
+        return _Span(self, name, args)
+
+    def add(self, name: str, start_time: int, end_time: int, **args) -> None:
+        self._spans.append((name, start_time, end_time, args))
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+    def get_chrome_trace_events(self) -> list[dict[str, Any]]:
+        pid = os.getpid()
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": self._track_id, "args": {"name": self._track}},
+        ]
+        for name, start_time, end_time, args in self._spans:
+            events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": start_time / 1000,
+                    "dur": (end_time - start_time) / 1000,
+                    "pid": pid,
+                    "tid": self._track_id,
+                    "args": args,
+                }
+            )
+
+        return events
+
+
+def dump_chrome_trace(tracers: list[Tracer], path: str) -> None:
+    # Writes a file that can be loaded in chrome://tracing or https://ui.perfetto.dev
+    events = []
+    for tracer in tracers:
+        events += tracer.get_chrome_trace_events()
+
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)